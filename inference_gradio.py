@@ -1,9 +1,14 @@
+import os
+# Grow allocator segments in place instead of fragmenting across differently sized requests;
+# must be set before CUDA is initialized
+os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True')
+
 import torch
 import json
 
 # Import refactored modules
 from models.image_tagger import ImageTagger
-from utils.image_processing import create_transform
+from utils.image_processing import create_transform, create_gpu_transform
 from utils.batch_processing import (
     process_folder,
     process_urls,
@@ -11,7 +16,8 @@ from utils.batch_processing import (
     format_results_as_csv,
     save_csv_to_file,
     create_txt_files_zip,
-    create_txt_and_images_zip
+    create_txt_and_images_zip,
+    create_output_files
 )
 from ui.gradio_interface import create_interface
 
@@ -25,7 +31,8 @@ def main():
     
     # Create tagger and transform
     tagger = ImageTagger(model_path, tags_path)
-    transform = create_transform()
+    # On CUDA only the resize runs on the CPU, batches are uploaded as uint8
+    transform = create_gpu_transform() if torch.cuda.is_available() else create_transform()
     
     # Create and launch the interface
     demo = create_interface(
@@ -37,7 +44,8 @@ def main():
         format_csv_fn=format_results_as_csv,
         create_csv_file_fn=save_csv_to_file,
         create_txt_files_zip_fn=create_txt_files_zip,
-        create_txt_and_images_zip_fn=create_txt_and_images_zip
+        create_txt_and_images_zip_fn=create_txt_and_images_zip,
+        create_output_files_fn=create_output_files
     )
     
     # Launch the demo
@@ -1,84 +1,418 @@
-import torch
-import timm
-from timm.models import VisionTransformer
-import safetensors.torch
-import json
-
-class ImageTagger:
-    def __init__(self, model_path, tags_path):
-        # Load tags
-        with open(tags_path, "r") as file:
-            tags = json.load(file)  # type: dict
-        self.allowed_tags = list(tags.keys())
-        
-        for idx, tag in enumerate(self.allowed_tags):
-            self.allowed_tags[idx] = tag.replace("_", " ")
-        
-        # Create model
-        self.model = timm.create_model(
-            "vit_so400m_patch14_siglip_384.webli",
-            pretrained=False,
-            num_classes=9083,
-        )
-        
-        # Initialize head
-        self.model.head = GatedHead(min(self.model.head.weight.shape), 9083)
-        
-        # Load model weights
-        safetensors.torch.load_model(self.model, model_path)
-        
-        # Move to GPU if available
-        if torch.cuda.is_available():
-            self.model.cuda()
-            if torch.cuda.get_device_capability()[0] >= 7:  # tensor cores
-                self.model.to(dtype=torch.float16, memory_format=torch.channels_last)
-        
-        self.model.eval()
-        self.sorted_tag_score = {}
-    
-    def process_image(self, image, transform, threshold):
-        img = image.convert('RGBA')
-        tensor = transform(img).unsqueeze(0)
-        
-        if torch.cuda.is_available():
-            tensor = tensor.cuda()
-            if torch.cuda.get_device_capability()[0] >= 7:  # tensor cores
-                tensor = tensor.to(dtype=torch.float16, memory_format=torch.channels_last)
-        
-        with torch.no_grad():
-            probits = self.model(tensor)[0].cpu()
-            values, indices = probits.topk(250)
-        
-        tag_score = dict()
-        for i in range(indices.size(0)):
-            # Only add tags that are within the range of our allowed_tags list
-            if indices[i] < len(self.allowed_tags):
-                tag_score[self.allowed_tags[indices[i]]] = values[i].item()
-        
-        self.sorted_tag_score = dict(sorted(tag_score.items(), key=lambda item: item[1], reverse=True))
-        
-        return self.create_tags(threshold)
-    
-    def create_tags(self, threshold):
-        filtered_tag_score = {key: value for key, value in self.sorted_tag_score.items() if value > threshold}
-        text_no_impl = ", ".join(filtered_tag_score.keys())
-        return text_no_impl, filtered_tag_score
-    
-    def clear(self):
-        self.sorted_tag_score = {}
-        return "", {}
-
-
-class GatedHead(torch.nn.Module):
-    def __init__(self, num_features, num_classes):
-        super().__init__()
-        self.num_classes = num_classes
-        self.linear = torch.nn.Linear(num_features, num_classes * 2)
-        
-        self.act = torch.nn.Sigmoid()
-        self.gate = torch.nn.Sigmoid()
-    
-    def forward(self, x):
-        x = self.linear(x)
-        x = self.act(x[:, :self.num_classes]) * self.gate(x[:, self.num_classes:])
-        return x
\ No newline at end of file
+import torch
+import timm
+from timm.models import VisionTransformer
+import safetensors.torch
+import json
+import os
+import numpy as np
+import threading
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+BATCH_SIZE = 16
+MAX_TAGS = 250  # matches the number of classes shown in the UI
+PROBITS_CACHE_SIZE = 8
+
+class ImageTagger:
+    def __init__(self, model_path, tags_path):
+        # Load tags
+        with open(tags_path, "r") as file:
+            tags = json.load(file)  # type: dict
+        # Object array so a whole index tensor can be gathered in one go
+        self.allowed_tags = np.array([tag.replace("_", " ") for tag in tags.keys()], dtype=object)
+
+        # Create model on the meta device, the real tensors come straight from the checkpoint
+        with torch.device('meta'):
+            self.model = timm.create_model(
+                "vit_so400m_patch14_siglip_384.webli",
+                pretrained=False,
+                num_classes=0,
+            )
+
+            # Initialize head
+            self.model.head = GatedHead(self.model.num_features, 9083)
+
+        # Route attention (blocks and the attention pool) through F.scaled_dot_product_attention
+        # so PyTorch can pick the flash/memory-efficient kernels, even if timm was told not to
+        if hasattr(torch.nn.functional, 'scaled_dot_product_attention'):
+            for module in self.model.modules():
+                if hasattr(module, 'fused_attn'):
+                    module.fused_attn = True
+
+        # Load model weights memory-mapped onto the target device, skipping
+        # any checkpoint entries the model has no parameter for
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        expected_keys = self.model.state_dict().keys()
+        with safetensors.safe_open(model_path, framework='pt', device=device) as f:
+            state_dict = {key: f.get_tensor(key) for key in f.keys() if key in expected_keys}
+        self.model.load_state_dict(state_dict, assign=True)
+
+        # Move to GPU if available
+        if torch.cuda.is_available():
+            # Let any remaining FP32 matmuls/convs use tensor cores (TF32) and
+            # have cuDNN pick the fastest algorithm for our fixed input shape
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            torch.backends.cudnn.benchmark = True
+            torch.set_float32_matmul_precision('high')
+
+            self.model.cuda()
+            if torch.cuda.get_device_capability()[0] >= 7:  # tensor cores
+                self.model.to(dtype=torch.float16, memory_format=torch.channels_last)
+                self._input_buffer = torch.empty(
+                    BATCH_SIZE, 3, 384, 384,
+                    device='cuda',
+                    dtype=torch.float16
+                ).to(memory_format=torch.channels_last)
+            else:
+                self._input_buffer = torch.empty(BATCH_SIZE, 3, 384, 384, device='cuda')
+
+        self.model.eval()
+
+        # Optional int8 Linear layers, done on the final device/dtype so the
+        # quantized weights are never round-tripped
+        int8_mode = os.environ.get('AUTOTAGGER_INT8')
+        if int8_mode and int8_mode != '0' and not os.environ.get('TRT_ENABLED'):
+            from models.quant import quantize_int8
+            quantize_int8(self.model, int8_mode)
+
+        # Scores of recently tagged images, so re-submitting the same image skips the model
+        self._probits_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.compiled = False
+        self.trt_engine = None
+        self._graph = None
+        # Held from the upload into _input_buffer until the scores are back on the host
+        self._device_lock = threading.Lock()
+        # Pinned host buffers are recycled once their batch has been copied to the GPU,
+        # so a pipeline filling one batch while inferring another cycles between two
+        self._pinned_lock = threading.Lock()
+        self._pinned_free = []
+        self._pinned_in_use = {}
+        # PIL releases the GIL while resizing, so the transforms can run side by side
+        self._transform_pool = ThreadPoolExecutor()
+
+        if torch.cuda.is_available():
+            if os.environ.get('TRT_ENABLED'):
+                from models.trt_engine import load_engine
+                self.trt_engine = load_engine(self.model, model_path, BATCH_SIZE)
+            else:
+                self._compile()
+            self._warmup()
+            if self.trt_engine is None:
+                self._capture_graph()
+
+    def _compile(self):
+        # Fuse the LayerNorm/GELU/residual chains between the matmuls into Triton kernels.
+        # Shapes stay static (partial batches are padded), so only batch sizes 1 and
+        # BATCH_SIZE are compiled. Inductor's own CUDA graphs ('reduce-overhead') keep their
+        # state per thread and requests arrive on Gradio's worker threads, so the graph for
+        # batch 1 is captured by _capture_graph instead, which replays from any thread.
+        if not hasattr(torch, 'compile'):
+            return
+
+        eager_model = self.model
+        try:
+            self.model = torch.compile(eager_model, dynamic=False)
+            for batch_size in (1, BATCH_SIZE):
+                self._warmup(batch_size)
+            self.compiled = True
+        except Exception as e:
+            # e.g. no Triton on this platform
+            print(f"torch.compile failed, falling back to eager mode: {str(e)}")
+            self.model = eager_model
+
+    def _capture_graph(self):
+        # Single-image requests always have the same shape, so record that forward (eager or
+        # compiled) once and replay it as one launch
+        static_input = self._input_buffer[:1]
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        try:
+            with torch.inference_mode():
+                with torch.cuda.stream(stream):
+                    for _ in range(3):
+                        self.model(static_input)
+                torch.cuda.current_stream().wait_stream(stream)
+
+                graph = torch.cuda.CUDAGraph()
+                with torch.cuda.graph(graph):
+                    self._graph_output = self.model(static_input)
+            self._graph = graph
+        except Exception as e:
+            print(f"CUDA graph capture failed, running single images without it: {str(e)}")
+
+    def _warmup(self, batch_size=1):
+        # Run a dummy forward so cuDNN caches its algorithm choice before the first real request
+        dummy = self._to_device(torch.zeros(batch_size, 3, 384, 384))
+        with torch.inference_mode():
+            self._forward(dummy)
+        torch.cuda.synchronize()
+
+    def _forward(self, batch):
+        if self._graph is not None and batch.shape[0] == 1 and batch.data_ptr() == self._input_buffer.data_ptr():
+            # Inputs were already copied into the captured buffer
+            self._graph.replay()
+            return self._graph_output
+        if self.trt_engine is not None:
+            return self.trt_engine(batch)
+        return self.model(batch)
+
+    def _to_device(self, tensor, transform=None):
+        # Callers hold _device_lock, the input buffer is shared between requests
+        if tensor.dtype == torch.uint8:
+            # Canvases from a DeviceTransform cross PCIe as uint8 and are expanded on the GPU
+            if torch.cuda.is_available():
+                tensor = tensor.cuda(non_blocking=True)
+            tensor = transform.device_transform(tensor)
+        if torch.cuda.is_available():
+            # Upload and dtype/layout conversion in one copy into the persistent buffer
+            if tensor.shape[0] <= self._input_buffer.shape[0]:
+                buffer = self._input_buffer[:tensor.shape[0]]
+            else:
+                # preprocess and process_images take any batch_size, larger batches than the
+                # persistent buffer get a temporary one with the same dtype and layout
+                layout = torch.channels_last if self._input_buffer.is_contiguous(memory_format=torch.channels_last) else torch.contiguous_format
+                buffer = torch.empty(
+                    (tensor.shape[0], *self._input_buffer.shape[1:]),
+                    device='cuda',
+                    dtype=self._input_buffer.dtype,
+                    memory_format=layout
+                )
+            buffer.copy_(tensor, non_blocking=True)
+            return buffer
+        return tensor
+
+    def _probits_to_tags(self, probits, threshold):
+        # Threshold the whole score vector at once, then sort only the survivors
+        indices = torch.nonzero(probits > threshold, as_tuple=True)[0]
+        values = probits[indices]
+        order = values.argsort(descending=True)[:MAX_TAGS]
+
+        tag_score = dict(zip(
+            self.allowed_tags[indices[order].numpy()].tolist(),
+            values[order].tolist()
+        ))
+        return ", ".join(tag_score), tag_score
+
+    def _cache_key(self, image):
+        key = hashlib.blake2b(image.tobytes(), digest_size=16)
+        key.update(f"{image.mode}{image.size}".encode())
+        return key.digest()
+
+    def _cached_probits(self, key):
+        with self._cache_lock:
+            probits = self._probits_cache.get(key)
+            if probits is not None:
+                self._probits_cache.move_to_end(key)
+            return probits
+
+    def _cache_probits(self, key, probits):
+        with self._cache_lock:
+            self._probits_cache[key] = probits
+            if len(self._probits_cache) > PROBITS_CACHE_SIZE:
+                self._probits_cache.popitem(last=False)
+
+    def process_image(self, image, transform, threshold):
+        return self.process_image_batch([image], transform, [threshold])[0]
+
+    def process_image_batch(self, images, transform, thresholds):
+        """Tag independent single-image requests together in one forward pass.
+
+        Each image gets its own threshold. Returns a list of (tags, scores) tuples
+        in the same order as images.
+        """
+        probits = self.score_images(images, transform)
+        return [self._probits_to_tags(row, threshold) for row, threshold in zip(probits, thresholds)]
+
+    def score_images(self, images, transform):
+        """Raw scores of independent single-image requests, from one forward pass.
+
+        Scores are cached per image, so re-submitting an image skips the model.
+        Returns one CPU score tensor per image; callers keep it (e.g. in session
+        state) to re-threshold with create_tags.
+        """
+        keys = [self._cache_key(image) for image in images]
+        probits = [self._cached_probits(key) for key in keys]
+
+        missing = [index for index, row in enumerate(probits) if row is None]
+        if missing:
+            batch, count = self.preprocess([images[index] for index in missing], transform)
+            for index, row in zip(missing, self._infer_probits(batch, count, transform)):
+                probits[index] = row
+                self._cache_probits(keys[index], row)
+
+        return probits
+
+    def _acquire_pinned(self, size, shape, dtype):
+        buffer = None
+        with self._pinned_lock:
+            for index, candidate in enumerate(self._pinned_free):
+                if candidate.shape[0] >= size and candidate.shape[1:] == shape and candidate.dtype == dtype:
+                    buffer = self._pinned_free.pop(index)
+                    break
+        if buffer is None:
+            buffer = torch.empty(max(size, BATCH_SIZE), *shape, dtype=dtype).pin_memory()
+        with self._pinned_lock:
+            self._pinned_in_use[buffer.data_ptr()] = buffer
+        return buffer[:size]
+
+    def _release_pinned(self, batch):
+        with self._pinned_lock:
+            buffer = self._pinned_in_use.pop(batch.data_ptr(), None)
+            if buffer is not None:
+                self._pinned_free.append(buffer)
+
+    def release(self, batch):
+        """Hand back a batch from preprocess that will not be passed to infer.
+
+        infer already does this itself; call it when a prepared batch is dropped
+        (an error, a cancelled run) so its pinned buffer can be reused.
+        """
+        if torch.cuda.is_available():
+            self._release_pinned(batch)
+
+    def _release_pending(self, pending):
+        # Wait for a prefetched preprocess that will not be inferred and release its batch
+        try:
+            batch, _ = pending.result()
+        except Exception:
+            return
+        self.release(batch)
+
+    def preprocess(self, images, transform, batch_size=BATCH_SIZE):
+        """Transform up to batch_size images into one host-side batch.
+
+        Returns (batch, count) to pass to infer. On CUDA the batch lives in a
+        pinned buffer that infer hands back for reuse; a batch that never reaches
+        infer must be given to release instead.
+        """
+        futures = [self._transform_pool.submit(host_transform, transform, img) for img in images]
+        # Let every image finish before raising, so a failed decode never leaves others still
+        # being read by the pool while the caller handles the error
+        wait(futures)
+        tensors = [future.result() for future in futures]
+        count = len(tensors)
+        size = count
+        if self.compiled and 1 < count < batch_size:
+            # Pad the last partial batch to the compiled shape instead of recompiling
+            size = batch_size
+
+        if not torch.cuda.is_available():
+            return torch.stack(tensors + [tensors[-1]] * (size - count)), count
+
+        batch = self._acquire_pinned(size, tensors[0].shape, tensors[0].dtype)
+        try:
+            torch.stack(tensors, out=batch[:count])
+        except Exception:
+            self.release(batch)
+            raise
+        if size > count:
+            batch[count:] = batch[count - 1]
+        return batch, count
+
+    def infer(self, batch, count, threshold, transform=None):
+        """Run a batch from preprocess through the model.
+
+        transform must be the one passed to preprocess when it was a DeviceTransform.
+        Returns a list of (tags, scores) tuples, one per real (unpadded) image.
+        """
+        return [self._probits_to_tags(row, threshold) for row in self._infer_probits(batch, count, transform)]
+
+    def _infer_probits(self, batch, count, transform=None):
+        # Scores for the real (unpadded) images, as a float tensor on the CPU
+        try:
+            with self._device_lock, torch.inference_mode():
+                # Copies from pinned memory are asynchronous, the forward is queued right behind it
+                device_batch = self._to_device(batch, transform)
+                # Only keep scores for tags that are within the range of our allowed_tags list
+                probits = self._forward(device_batch)[:count, :len(self.allowed_tags)]
+
+                # One device-to-host copy per batch, which also waits for the upload to finish
+                probits = probits.float().cpu()
+        finally:
+            if torch.cuda.is_available():
+                torch.cuda.current_stream().synchronize()
+                self._release_pinned(batch)
+
+        return probits
+
+    def process_images(self, images, transform, threshold, batch_size=BATCH_SIZE):
+        """Tag a list of images, running up to batch_size of them per forward pass.
+
+        Returns a list of (tags, scores) tuples in the same order as images.
+        Unlike process_image, scores are not cached.
+        """
+        chunks = [images[start:start + batch_size] for start in range(0, len(images), batch_size)]
+        results = []
+        if not chunks:
+            return results
+
+        # Transform the next chunk while the current one runs on the GPU
+        with ThreadPoolExecutor(max_workers=1) as loader:
+            pending = loader.submit(self.preprocess, chunks[0], transform, batch_size)
+            for index in range(len(chunks)):
+                batch, count = pending.result()
+                pending = None
+                if index + 1 < len(chunks):
+                    pending = loader.submit(self.preprocess, chunks[index + 1], transform, batch_size)
+                try:
+                    results.extend(self.infer(batch, count, threshold, transform))
+                except BaseException:
+                    # e.g. CUDA OOM, the prefetched batch is never inferred
+                    if pending is not None:
+                        self._release_pending(pending)
+                    raise
+
+        return results
+
+    def create_tags(self, probits, threshold):
+        """Re-threshold scores from score_images without running the model again"""
+        if probits is None:
+            return "", {}
+        return self._probits_to_tags(probits, threshold)
+
+
+def host_transform(transform, image):
+    """Run the part of transform that happens on the CPU.
+
+    For a DeviceTransform that is the resize onto a uint8 canvas, which
+    ImageTagger finishes on the GPU; any other transform runs in full.
+    """
+    host = getattr(transform, 'host_transform', transform)
+    # A Fit at the start of the pipeline can have JPEGs decoded at a reduced scale
+    first = getattr(host, 'transforms', [None])[0]
+    if hasattr(first, 'draft'):
+        first.draft(image)
+    return host(to_model_mode(image))
+
+
+def to_model_mode(image):
+    """Convert an image to RGB, or to RGBA only when it can actually be transparent.
+
+    CompositeAlpha in the transform flattens the alpha channel itself, so opaque
+    images skip the extra plane (and RGB ones the copy) entirely.
+    """
+    if image.mode == 'RGB' or image.mode == 'RGBA':
+        return image
+    if (
+        image.mode in ('LA', 'PA', 'RGBa', 'La')
+        or 'transparency' in image.info
+        or (image.mode == 'P' and image.palette.mode == 'RGBA')
+    ):
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+class GatedHead(torch.nn.Module):
+    def __init__(self, num_features, num_classes):
+        super().__init__()
+        self.num_classes = num_classes
+        self.linear = torch.nn.Linear(num_features, num_classes * 2)
+
+    def forward(self, x):
+        x = self.linear(x)
+        # First half is the activation, second half the gate; compile fuses both sigmoids and the mul
+        act, gate = x.chunk(2, dim=-1)
+        return torch.sigmoid(act) * torch.sigmoid(gate)
\ No newline at end of file
@@ -0,0 +1,29 @@
+import torch
+
+def _int8_config(dynamic):
+    # torchao renamed the config factories to classes in 0.10
+    try:
+        from torchao.quantization import Int8WeightOnlyConfig, Int8DynamicActivationInt8WeightConfig
+        return Int8DynamicActivationInt8WeightConfig() if dynamic else Int8WeightOnlyConfig()
+    except ImportError:
+        from torchao.quantization import int8_weight_only, int8_dynamic_activation_int8_weight
+        return int8_dynamic_activation_int8_weight() if dynamic else int8_weight_only()
+
+def quantize_int8(model, mode='1'):
+    """Quantize the model's Linear layers to int8 in place with torchao.
+    
+    mode '1' stores int8 weights and dequantizes them inside the matmul,
+    'dynamic' also quantizes activations per token on the fly. Neither
+    needs calibration data. Returns False if torchao is not installed.
+    """
+    try:
+        from torchao.quantization import quantize_
+    except ImportError:
+        print("AUTOTAGGER_INT8 is set but torchao is not installed, skipping quantization")
+        return False
+    
+    dynamic = mode == 'dynamic'
+    with torch.no_grad():
+        quantize_(model, _int8_config(dynamic))
+    print(f"Quantized model to int8 ({'dynamic activations' if dynamic else 'weight only'})")
+    return True
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os
+import torch
+
+def export_onnx(model, onnx_path, dtype=torch.float16, max_batch_size=16):
+    """Export the tagger model to ONNX with a dynamic batch dimension"""
+    dummy = torch.zeros(max_batch_size, 3, 384, 384, device='cuda', dtype=dtype)
+    torch.onnx.export(
+        model,
+        dummy,
+        onnx_path,
+        input_names=['input'],
+        output_names=['output'],
+        dynamic_axes={'input': {0: 'B'}, 'output': {0: 'B'}},
+        opset_version=17
+    )
+
+def build_engine(onnx_path, engine_path, fp16=True, workspace=2 << 30, max_batch_size=16):
+    """Build a TensorRT engine from an ONNX file and serialize it to engine_path"""
+    import tensorrt as trt
+
+    logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(logger)
+    if int(trt.__version__.split('.')[0]) >= 10:
+        network = builder.create_network(0)  # explicit batch is the only mode
+    else:
+        network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, logger)
+
+    with open(onnx_path, 'rb') as f:
+        if not parser.parse(f.read()):
+            errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+            raise RuntimeError(f"Failed to parse ONNX model: {'; '.join(errors)}")
+
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, workspace)
+    if fp16:
+        config.set_flag(trt.BuilderFlag.FP16)
+
+    # Single-image requests and full batches are the shapes we actually run
+    profile = builder.create_optimization_profile()
+    profile.set_shape(
+        'input',
+        (1, 3, 384, 384),
+        (max_batch_size, 3, 384, 384),
+        (max_batch_size, 3, 384, 384)
+    )
+    config.add_optimization_profile(profile)
+
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("Failed to build TensorRT engine")
+
+    with open(engine_path, 'wb') as f:
+        f.write(serialized)
+
+class TRTEngine:
+    """Runs a serialized TensorRT engine directly on CUDA torch tensors"""
+
+    def __init__(self, engine_path):
+        import tensorrt as trt
+
+        logger = trt.Logger(trt.Logger.WARNING)
+        with open(engine_path, 'rb') as f:
+            runtime = trt.Runtime(logger)
+            self.engine = runtime.deserialize_cuda_engine(f.read())
+        if self.engine is None:
+            raise RuntimeError(f"Failed to load TensorRT engine from {engine_path}")
+
+        self.context = self.engine.create_execution_context()
+        output_dtype = self.engine.get_tensor_dtype('output')
+        self.output_dtype = torch.float16 if output_dtype == trt.DataType.HALF else torch.float32
+
+    def __call__(self, batch):
+        # TensorRT expects a dense NCHW buffer
+        batch = batch.contiguous()
+        if not self.context.set_input_shape('input', tuple(batch.shape)):
+            raise RuntimeError(f"Batch of {batch.shape[0]} is outside the TensorRT engine's optimization profile")
+        output = torch.empty(
+            tuple(self.context.get_tensor_shape('output')),
+            device=batch.device,
+            dtype=self.output_dtype
+        )
+
+        self.context.set_tensor_address('input', batch.data_ptr())
+        self.context.set_tensor_address('output', output.data_ptr())
+        if not self.context.execute_async_v3(torch.cuda.current_stream().cuda_stream):
+            raise RuntimeError("TensorRT inference failed")
+        return output
+
+def load_engine(model, model_path, max_batch_size=16):
+    """Load the cached engine for model_path, exporting and building it on first use.
+
+    Engines are specific to the GPU and TensorRT version they were built with;
+    delete the .engine file to force a rebuild.
+    """
+    base_path = os.path.splitext(model_path)[0]
+    engine_path = base_path + '.engine'
+
+    if not os.path.isfile(engine_path):
+        onnx_path = base_path + '.onnx'
+        if not os.path.isfile(onnx_path):
+            print(f"Exporting model to {onnx_path}")
+            export_onnx(model, onnx_path, next(model.parameters()).dtype, max_batch_size)
+        print(f"Building TensorRT engine {engine_path}, this can take several minutes")
+        build_engine(onnx_path, engine_path, max_batch_size=max_batch_size)
+
+    return TRTEngine(engine_path)
\ No newline at end of file
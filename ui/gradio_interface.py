@@ -1,735 +1,873 @@
-import gradio as gr
-import utils.batch_processing
-import os
-import base64
-import json
-import csv
-import tempfile
-from io import BytesIO
-from typing import Callable, Dict, Any, Tuple, List
-
-def format_results_as_html(results: List[Dict]) -> str:
-    """Format results as HTML with image thumbnails and tags"""
-    # Add a wrapper with a specific class for styling
-    html_output = "<div class='results-container' style='display: flex; flex-direction: column; gap: 20px;'>"
-    
-    for result in results:
-        if 'error' in result:
-            # Handle error case
-            error_source = result.get('filename', result.get('url', result.get('input', 'unknown')))
-            html_output += f"<div><p>Error processing {error_source}: {result['error']}</p></div>"
-        else:
-            # Create a row with image thumbnail and tags
-            html_output += "<div style='display: flex; gap: 15px; border-bottom: 1px solid #ddd; padding-bottom: 15px;'>"
-            
-            # Image thumbnail column (clickable)
-            html_output += "<div style='flex: 0 0 250px;'>"
-            # Use data URI for the image
-            if 'image' in result:
-                # Convert PIL image to data URI
-                buffered = BytesIO()
-                img = result['image'].copy()
-                img.thumbnail((250, 250))  # Resize to thumbnail
-                img.save(buffered, format="PNG")
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                data_uri = f"data:image/png;base64,{img_str}"
-                
-                # Create clickable image that opens full size in new tab
-                source = result.get('path', result.get('url', ''))
-                html_output += f"<a href='{source}' target='_blank'><img src='{data_uri}' style='max-width: 250px; max-height: 250px;' alt='{result.get('filename', result.get('url', ''))}'/></a>"
-            html_output += "</div>"
-            
-            # Tags column
-            html_output += "<div style='flex: 1;'>"
-            html_output += f"<p><strong>{result.get('filename', result.get('url', ''))}</strong></p>"
-            html_output += f"<p>{result['tags']}</p>"
-            html_output += "</div>"
-            
-            html_output += "</div>"
-    
-    html_output += "</div>"
-    return html_output
-
-def create_interface(
-    tagger,
-    transform,
-    process_folder_fn,
-    process_urls_fn,
-    process_urls_or_paths_fn,
-    format_csv_fn,
-    create_csv_file_fn,
-    create_txt_files_zip_fn,
-    create_txt_and_images_zip_fn
-):
-    """Create the Gradio interface with tabs for single and batch processing"""
-    print("Starting create_interface function")
-    
-    # Single image processing functions
-    def run_classifier(image, threshold):
-        if image is None:
-            return "", {}
-        return tagger.process_image(image, transform, threshold)
-    
-    def clear_image():
-        return tagger.clear()
-    
-    # Use a simple variable for cancellation
-    is_cancelled = False
-    
-    # Batch processing functions
-    def process_folder_path(folder_path, threshold, progress=gr.Progress()):
-        import os
-        if not folder_path or not os.path.isdir(folder_path):
-            return "<p>Invalid folder path</p>", None, None, None
-        
-        # Reset cancellation state at the start of processing
-        global is_cancelled
-        is_cancelled = False
-        
-        def progress_callback(current, total):
-            progress(current/total, f"Processing image {current}/{total}")
-            # Check the cancel_processing state
-            global is_cancelled
-            return not is_cancelled
-        
-        results = process_folder_fn(folder_path, tagger, transform, threshold, progress_callback)
-        
-        csv_output = format_csv_fn(results)
-        html_output = format_results_as_html(results)
-        
-        # Create downloadable files
-        csv_file_path = os.path.join(tempfile.mkdtemp(), 'tags.csv')
-        create_csv_file_fn(csv_file_path, csv_output)
-        
-        # Create TXT files zip
-        txt_zip_path = os.path.join(tempfile.mkdtemp(), 'tags.zip')
-        create_txt_files_zip_fn(txt_zip_path, results)
-        
-        # Create TXT and images zip
-        all_zip_path = os.path.join(tempfile.mkdtemp(), 'tags_and_images.zip')
-        create_txt_and_images_zip_fn(all_zip_path, results)
-        
-        return html_output, csv_file_path, txt_zip_path, all_zip_path
-    
-    def process_url_list(url_list, threshold, progress=gr.Progress()):
-        if not url_list:
-            return "<p>No URLs provided</p>", None, None, None
-        
-        # Reset cancellation state at the start of processing
-        global is_cancelled
-        is_cancelled = False
-        
-        def progress_callback(current, total):
-            progress(current/total, f"Processing URL {current}/{total}")
-            # Check the cancel_processing state
-            global is_cancelled
-            return not is_cancelled
-        
-        results = process_urls_fn(url_list.split('\n'), tagger, transform, threshold, progress_callback)
-        
-        csv_output = format_csv_fn(results)
-        html_output = format_results_as_html(results)
-        
-        # Create downloadable files
-        csv_file_path = os.path.join(tempfile.mkdtemp(), 'tags.csv')
-        create_csv_file_fn(csv_file_path, csv_output)
-        
-        # Create TXT files zip
-        txt_zip_path = os.path.join(tempfile.mkdtemp(), 'tags.zip')
-        create_txt_files_zip_fn(txt_zip_path, results)
-        
-        # Create TXT and images zip
-        all_zip_path = os.path.join(tempfile.mkdtemp(), 'tags_and_images.zip')
-        create_txt_and_images_zip_fn(all_zip_path, results)
-        
-        return html_output, csv_file_path, txt_zip_path, all_zip_path
-    
-    def process_url_or_path_list(input_list, threshold, progress=gr.Progress()):
-        if not input_list:
-            return "<p>No URLs or paths provided</p>", None, None, None
-        
-        # Reset cancellation state at the start of processing
-        global is_cancelled
-        is_cancelled = False
-        
-        def progress_callback(current, total):
-            progress(current/total, f"Processing item {current}/{total}")
-            # Check the cancel_processing state
-            global is_cancelled
-            return not is_cancelled
-        
-        results = process_urls_or_paths_fn(input_list.split('\n'), tagger, transform, threshold, progress_callback)
-        
-        csv_output = format_csv_fn(results)
-        html_output = format_results_as_html(results)
-        
-        # Create downloadable files
-        csv_file_path = os.path.join(tempfile.mkdtemp(), 'tags.csv')
-        create_csv_file_fn(csv_file_path, csv_output)
-        
-        # Create TXT files zip
-        txt_zip_path = os.path.join(tempfile.mkdtemp(), 'tags.zip')
-        create_txt_files_zip_fn(txt_zip_path, results)
-        
-        # Create TXT and images zip
-        all_zip_path = os.path.join(tempfile.mkdtemp(), 'tags_and_images.zip')
-        create_txt_and_images_zip_fn(all_zip_path, results)
-        
-        return html_output, csv_file_path, txt_zip_path, all_zip_path
-    
-    # Tag Translator Functions
-    def dict_to_text(translations):
-        """Convert translations dictionary to text format."""
-        lines = []
-        
-        # Add header comment
-        lines.append("# Tag Translations")
-        lines.append("# Format: original_tag: translation")
-        lines.append("# Use a period (.) to delete a tag")
-        lines.append("# Leave empty to keep the original tag")
-        lines.append("")
-        
-        # Add translations
-        for original, translation in sorted(translations.items()):
-            lines.append(f"{original}: {translation}")
-        
-        return "\n".join(lines)
-
-    def text_to_dict(text):
-        """Convert text format to translations dictionary."""
-        translations = {}
-        
-        print("Converting text to translations dictionary:")
-        print(f"Text length: {len(text)}")
-        
-        for line in text.split("\n"):
-            # Skip empty lines and comments
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            
-            # Parse line
-            parts = line.split(":", 1)
-            if len(parts) == 2:
-                original = parts[0].strip()
-                translation = parts[1].strip()
-                
-                print(f"Parsed line: '{original}' -> '{translation}'")
-                
-                if original:
-                    if translation == ".":
-                        # Period means delete the tag - add it to translations with "." value
-                        translations[original] = "."
-                        print(f"  Added deletion entry for '{original}'")
-                    elif translation:
-                        translations[original] = translation
-                        print(f"  Added translation entry for '{original}'")
-                    else:
-                        # Empty translation means keep the original
-                        print(f"  Skipping empty translation for '{original}'")
-        
-        return translations
-    
-    def load_all_tags():
-        """Load all tags from tags.json with empty translations."""
-        try:
-            with open("tags.json", "r") as file:
-                tags = json.load(file)
-            
-            # Create text with all tags
-            lines = ["# Tag Translations", "# Format: original_tag: translation", "# Use a period (.) to delete a tag", "# Leave empty to keep the original tag", ""]
-            
-            # Add all tags with empty translations
-            for tag in sorted(tags.keys()):
-                # Replace underscores with spaces (as done in ImageTagger)
-                display_tag = tag.replace("_", " ")
-                lines.append(f"{display_tag}: ")
-            
-            return "\n".join(lines), f"Loaded all {len(tags)} tags from tags.json"
-        except Exception as e:
-            return "# Error loading tags", f"Error loading tags: {str(e)}"
-    
-    def load_translations_file(file_path):
-        """Load translations from a CSV file."""
-        try:
-            translations = {}
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader, None)
-                if not header or len(header) < 2:
-                    return {}, "Invalid CSV format. Expected at least 2 columns."
-                
-                for row in reader:
-                    if len(row) >= 2 and row[1].strip():  # Only store non-empty translations
-                        translations[row[0]] = row[1]
-            
-            return translations, f"Loaded {len(translations)} translations successfully."
-        except Exception as e:
-            return {}, f"Error loading translations: {str(e)}"
-            
-    def load_translations_text(file_path):
-        """Load translations from a CSV file and convert to text format."""
-        translations, message = load_translations_file(file_path)
-        text = dict_to_text(translations)
-        return text, message
-    
-    def save_translations_text(text):
-        """Convert text to translations dictionary and save to a CSV file."""
-        translations = text_to_dict(text)
-        
-        if not translations:
-            return None, "No translations to save. Please add some translations first."
-        
-        temp_file = tempfile.mktemp(suffix='.csv')
-        status_message = save_translations_file(temp_file, translations)
-        
-        return temp_file, status_message
-    
-    def save_translations_file(file_path, translations):
-        """Save translations to a CSV file."""
-        try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["original", "translation"])
-                for original, translation in translations.items():
-                    writer.writerow([original, translation])
-            
-            return f"Saved {len(translations)} translations to {file_path}"
-        except Exception as e:
-            return f"Error saving translations: {str(e)}"
-    
-    def apply_translations_to_file(file_path, text):
-        """Apply translations from text to a file."""
-        print(f"apply_translations_to_file called with file_path: {file_path}")
-        print(f"Text length: {len(text)}")
-        
-        translations = text_to_dict(text)
-        print(f"Parsed {len(translations)} translations from text")
-        
-        if not translations:
-            print("No translations to apply")
-            return None, "No translations to apply. Please add some translations first."
-        
-        print(f"Calling process_translate_file with {len(translations)} translations")
-        return process_translate_file(file_path, translations)
-    
-    def process_translate_file(file_path, translations):
-        """Translate tags in a file (TXT or CSV)."""
-        print(f"process_translate_file called with file_path: {file_path}")
-        print(f"Number of translations: {len(translations)}")
-        
-        try:
-            if not file_path or not os.path.isfile(file_path):
-                print(f"Invalid file path: {file_path}")
-                return None, "Invalid file path"
-            
-            if not translations:
-                print("No translations provided")
-                return None, "No translations provided"
-            
-            ext = os.path.splitext(file_path)[1].lower()
-            print(f"File extension: {ext}")
-            
-            # Create a temporary directory for the output file
-            temp_dir = tempfile.mkdtemp()
-            print(f"Created temporary directory: {temp_dir}")
-            
-            if ext == '.txt':
-                print("Processing TXT file")
-                translated_content = utils.batch_processing.translate_txt_file(file_path, translations)
-                output_filename = os.path.basename(file_path).replace('.txt', '_translated.txt')
-                output_path = os.path.join(temp_dir, output_filename)
-                print(f"Writing translated content to: {output_path}")
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(translated_content)
-                
-                print(f"TXT file created: {output_path}")
-                return output_path, f"Translated TXT file created"
-            
-            elif ext == '.csv':
-                print("Processing CSV file")
-                translated_content = utils.batch_processing.translate_csv_file(file_path, translations)
-                output_filename = os.path.basename(file_path).replace('.csv', '_translated.csv')
-                output_path = os.path.join(temp_dir, output_filename)
-                print(f"Writing translated content to: {output_path}")
-                print(f"Translated content size: {len(translated_content)} bytes")
-                
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(translated_content)
-                
-                # Verify the file was created
-                if os.path.exists(output_path):
-                    file_size = os.path.getsize(output_path)
-                    print(f"CSV file created: {output_path}, size: {file_size} bytes")
-                    return output_path, f"Translated CSV file created"
-                else:
-                    print(f"Failed to create file: {output_path}")
-                    return None, "Failed to create translated file"
-            
-            else:
-                print(f"Unsupported file type: {ext}")
-                return None, f"Unsupported file type: {ext}"
-        
-        except Exception as e:
-            import traceback
-            print(f"Error translating file: {str(e)}")
-            print(traceback.format_exc())
-            return None, f"Error translating file: {str(e)}"
-    
-    def process_translate_folder(folder_path, translations):
-        """Translate all TXT files in a folder."""
-        try:
-            if not folder_path or not os.path.isdir(folder_path):
-                return None, "Invalid folder path"
-            
-            if not translations:
-                return None, "No translations provided"
-            
-            results = utils.batch_processing.translate_txt_folder(folder_path, translations)
-            
-            if not results:
-                return None, "No TXT files found in the folder"
-            
-            # Create a zip file with translated TXT files
-            temp_dir = tempfile.mkdtemp()
-            zip_path = os.path.join(temp_dir, 'translated_tags.zip')
-            utils.batch_processing.create_translated_txt_files_zip(zip_path, results)
-            
-            return zip_path, f"Translated {len(results)} TXT files"
-        
-        except Exception as e:
-            return None, f"Error translating folder: {str(e)}"
-    
-    # Create the interface
-    print("Creating Gradio Blocks")
-    with gr.Blocks(css="""
-        .output-class { display: none; }
-        .results-container img { max-width: 250px; max-height: 250px; object-fit: contain; }
-        .results-container a { text-decoration: none; }
-        .results-container { margin-top: 10px; }
-        
-        /* Fix for table width issues */
-        table.svelte-1adtv9j,
-        table.svelte-1tckdwi,
-        .table-wrap table,
-        .gradio-container table {
-            table-layout: fixed !important;
-            width: 100% !important;
-        }
-        
-        /* Make sure columns have appropriate widths */
-        table.svelte-1adtv9j th:first-child,
-        table.svelte-1adtv9j td:first-child,
-        table.svelte-1tckdwi th:first-child,
-        table.svelte-1tckdwi td:first-child,
-        .table-wrap table th:first-child,
-        .table-wrap table td:first-child,
-        .gradio-container table th:first-child,
-        .gradio-container table td:first-child {
-            width: 50% !important;
-        }
-        
-        table.svelte-1adtv9j th:last-child,
-        table.svelte-1adtv9j td:last-child,
-        table.svelte-1tckdwi th:last-child,
-        table.svelte-1tckdwi td:last-child,
-        .table-wrap table th:last-child,
-        .table-wrap table td:last-child,
-        .gradio-container table th:last-child,
-        .gradio-container table td:last-child {
-            width: 50% !important;
-        }
-        
-        /* Ensure text wraps properly */
-        table.svelte-1adtv9j td,
-        table.svelte-1tckdwi td,
-        .table-wrap table td,
-        .gradio-container table td {
-            word-break: break-word !important;
-            white-space: normal !important;
-            overflow: hidden !important;
-            text-overflow: ellipsis !important;
-        }
-        
-        /* Fix for dataframe container */
-        .gradio-container [data-testid="dataframe"] {
-            overflow: hidden !important;
-            max-width: 100% !important;
-        }
-        
-        /* Improve status message visibility */
-        .gradio-container [data-testid="markdown"] {
-            font-weight: bold;
-            color: #4CAF50;
-        }
-    """) as demo:
-        gr.Markdown("""
-        ## Joint Tagger Project: JTP-PILOT² Demo **BETA**
-        This tagger is designed for use on furry images (though may very well work on out-of-distribution images, potentially with funny results).  A threshold of 0.2 is recommended.  Lower thresholds often turn up more valid tags, but can also result in some amount of hallucinated tags.
-        This tagger is the result of joint efforts between members of the RedRocket team, with distinctions given to Thessalo for creating the foundation for this project with his efforts, RedHotTensors for redesigning the process into a second-order method that models information expectation, and drhead for dataset prep, creation of training code and supervision of training runs.
-        Special thanks to Minotoro at frosting.ai for providing the compute power for this project.
-        """)
-        
-        with gr.Tabs():
-            # Single Image Tab
-            with gr.TabItem("Single Image"):
-                with gr.Row():
-                    with gr.Column():
-                        image_input = gr.Image(label="Source", sources=['upload'], type='pil', height=512, show_label=False)
-                        threshold_slider = gr.Slider(minimum=0.00, maximum=1.00, step=0.01, value=0.20, label="Threshold")
-                    with gr.Column():
-                        tag_string = gr.Textbox(label="Tag String")
-                        label_box = gr.Label(label="Tag Predictions", num_top_classes=250, show_label=False)
-                
-                with gr.Row():
-                    classify_btn = gr.Button("Classify", variant="primary")
-                    clear_btn = gr.Button("Clear")
-                
-                # Set up event handlers for single image processing
-                classify_btn.click(
-                    fn=run_classifier,
-                    inputs=[image_input, threshold_slider],
-                    outputs=[tag_string, label_box]
-                )
-                
-                clear_btn.click(
-                    fn=clear_image,
-                    inputs=[],
-                    outputs=[image_input, tag_string, label_box]
-                )
-                
-                threshold_slider.input(
-                    fn=lambda t: tagger.create_tags(t),
-                    inputs=[threshold_slider],
-                    outputs=[tag_string, label_box]
-                )
-            
-            # Batch Processing Tab
-            with gr.TabItem("Batch Processing"):
-                gr.Markdown("""
-                ### ⚠️ Warning
-                Avoid processing more than 100 images at once to prevent memory issues and long processing times.
-                """)
-                
-                with gr.Row():
-                    batch_threshold = gr.Slider(minimum=0.00, maximum=1.00, step=0.01, value=0.20, label="Threshold")
-                
-                with gr.Tabs():
-                    # Folder Processing Tab
-                    with gr.TabItem("Process Folder"):
-                        folder_path = gr.Textbox(label="Folder Path", placeholder="Enter folder path containing images")
-                        
-                        with gr.Row():
-                            process_folder_btn = gr.Button("Process Folder", variant="primary")
-                            cancel_folder_btn = gr.Button("Cancel", variant="stop")
-                        
-                        with gr.Row():
-                            gr.Markdown("### Download Options")
-                        
-                        with gr.Row():
-                            folder_csv = gr.File(label="CSV File", visible=True, interactive=False)
-                            folder_txt_zip = gr.File(label="TXT Files (ZIP)", visible=True, interactive=False)
-                            folder_all_zip = gr.File(label="TXT + Images (ZIP)", visible=True, interactive=False)
-                        
-                        folder_output = gr.HTML(label="Results")
-                        
-                        # Process folder button
-                        process_folder_btn.click(
-                            fn=process_folder_path,
-                            inputs=[folder_path, batch_threshold],
-                            outputs=[folder_output, folder_csv, folder_txt_zip, folder_all_zip]
-                        )
-                        
-                        # Function to set the cancellation flag
-                        def set_cancelled():
-                            global is_cancelled
-                            is_cancelled = True
-                            return "Cancelling..."
-                        
-                        # Cancel button
-                        cancel_folder_btn.click(
-                            fn=set_cancelled,
-                            inputs=[],
-                            outputs=[gr.Textbox(visible=False)]
-                        )
-                    
-                    # URL and Path Processing Tab
-                    with gr.TabItem("Process URLs/Paths"):
-                        url_input = gr.Textbox(
-                            label="Image URLs or Paths",
-                            placeholder="Enter one URL or file path per line\nURLs must start with http:// or https://\nPaths can be absolute (e.g., C:\\Images\\pic.png or /home/user/images/pic.jpg)",
-                            lines=5
-                        )
-                        
-                        with gr.Row():
-                            process_url_btn = gr.Button("Process URLs/Paths", variant="primary")
-                            cancel_url_btn = gr.Button("Cancel", variant="stop")
-                        
-                        with gr.Row():
-                            gr.Markdown("### Download Options")
-                        
-                        with gr.Row():
-                            url_csv = gr.File(label="CSV File", visible=True, interactive=False)
-                            url_txt_zip = gr.File(label="TXT Files (ZIP)", visible=True, interactive=False)
-                            url_all_zip = gr.File(label="TXT + Images (ZIP)", visible=True, interactive=False)
-                        
-                        url_output = gr.HTML(label="Results")
-                        
-                        # Process URLs/Paths button
-                        process_url_btn.click(
-                            fn=process_url_or_path_list,
-                            inputs=[url_input, batch_threshold],
-                            outputs=[url_output, url_csv, url_txt_zip, url_all_zip]
-                        )
-                        
-                        # Cancel button
-                        cancel_url_btn.click(
-                            fn=set_cancelled,
-                            inputs=[],
-                            outputs=[gr.Textbox(visible=False)]
-                        )
-            
-            # Tag Translator Tab
-            with gr.TabItem("Tag Translator"):
-                gr.Markdown("""
-                ## Tag Translator
-                This tab allows you to create and apply tag translations. You can:
-                - View and edit translations for tags
-                - Save translations to a CSV file
-                - Load translations from a CSV file
-                - Apply translations to TXT or CSV files
-                """)
-                
-                with gr.Tabs():
-                    # Translation Management Tab
-                    with gr.TabItem("Manage Translations"):
-                        gr.Markdown("""
-                        ### Tag Translation Management
-                        
-                        Edit translations in the text area below using the following format:
-                        
-                        ```
-                        original_tag: translation
-                        ```
-                        
-                        Special syntax:
-                        - `original_tag: translation` - Translate a tag
-                        - `original_tag: .` - Delete a tag
-                        - `original_tag:` - Keep the original tag (no translation)
-                        - `# Comment` - Add comments (will be ignored)
-                        
-                        Example:
-                        ```
-                        # My translations
-                        anthro: anthropomorphic
-                        female: female_character
-                        male: male_character
-                        # Delete this tag
-                        unwanted_tag: .
-                        ```
-                        
-                        Tips:
-                        - Use your text editor's search function (Ctrl+F) to find specific tags
-                        - Save your translations regularly
-                        """)
-                        
-                        # State for storing translations
-                        translation_state = gr.State({})
-                        
-                        # Text area for editing translations
-                        translation_text = gr.Textbox(
-                            label="Edit Translations",
-                            placeholder="Enter translations in the format 'original_tag: translation' (one per line)",
-                            lines=20,
-                            max_lines=30,
-                            interactive=True
-                        )
-                        
-                        # Controls
-                        with gr.Row():
-                            load_all_tags_btn = gr.Button("Load All Tags")
-                            load_btn = gr.Button("Load Translations")
-                            save_btn = gr.Button("Save Translations")
-                            translation_file = gr.File(label="Translation CSV File", file_types=[".csv"])
-                        
-                        # Status message
-                        translation_status = gr.Markdown("")
-                        
-                        # Load all tags button handler
-                        load_all_tags_btn.click(
-                            fn=load_all_tags,
-                            inputs=[],
-                            outputs=[translation_text, translation_status]
-                        )
-                        
-                        # Load translations from file
-                        load_btn.click(
-                            fn=lambda file: load_translations_text(file.name) if file else ("", "No file selected"),
-                            inputs=[translation_file],
-                            outputs=[translation_text, translation_status]
-                        )
-                        
-                        # Save translations to file
-                        save_btn.click(
-                            fn=save_translations_text,
-                            inputs=[translation_text],
-                            outputs=[translation_file, translation_status]
-                        )
-                        
-                        # Convert text to translations when needed
-                        def update_translation_state(text):
-                            """Update the translation state from text."""
-                            translations = text_to_dict(text)
-                            return translations
-                        
-                        # Update translation state when text changes
-                        translation_text.change(
-                            fn=update_translation_state,
-                            inputs=[translation_text],
-                            outputs=[translation_state]
-                        )
-                    
-                    # Apply Translations Tab
-                    with gr.TabItem("Apply Translations"):
-                        gr.Markdown("""
-                        ### Apply Translations to Files
-                        - Upload a TXT or CSV file to apply translations
-                        - For CSV files, translations are applied only to the tags column
-                        - For TXT files, you can also process a folder containing multiple TXT files
-                        
-                        The translations from the "Manage Translations" tab will be used.
-                        """)
-                        
-                        # Status message
-                        apply_status = gr.Markdown("")
-                        
-                        # File input options
-                        with gr.Tabs():
-                            # Single file option
-                            with gr.TabItem("Single File"):
-                                input_file = gr.File(label="Input File (TXT/CSV)", file_types=[".txt", ".csv"])
-                                translate_file_btn = gr.Button("Translate File")
-                                translated_file = gr.File(label="Translated File", interactive=False)
-                                
-                                # Translate single file
-                                translate_file_btn.click(
-                                    fn=lambda file, text: apply_translations_to_file(file.name if file else None, text),
-                                    inputs=[input_file, translation_text],
-                                    outputs=[translated_file, apply_status]
-                                )
-                            
-                            # Folder option (for TXT files)
-                            with gr.TabItem("Folder (TXT files only)"):
-                                folder_path_translate = gr.Textbox(label="Folder Path", placeholder="Enter folder path containing TXT files")
-                                translate_folder_btn = gr.Button("Translate Folder")
-                                translated_zip = gr.File(label="Translated Files (ZIP)", interactive=False)
-                                
-                                # Translate folder
-                                translate_folder_btn.click(
-                                    fn=lambda folder, text: process_translate_folder(folder, text_to_dict(text)),
-                                    inputs=[folder_path_translate, translation_text],
-                                    outputs=[translated_zip, apply_status]
-                                )
-
-    print("Returning demo:", demo)
+import gradio as gr
+import utils.batch_processing
+import os
+import stat
+import base64
+import json
+import functools
+import csv
+import re
+import tempfile
+import threading
+import atexit
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from typing import Callable, Dict, Any, Tuple, List
+
+# Static markup for format_results_as_html
+_RESULTS_OPEN = "<div class='results-container' style='display: flex; flex-direction: column; gap: 20px;'>"
+_ROW_OPEN = "<div style='display: flex; gap: 15px; border-bottom: 1px solid #ddd; padding-bottom: 15px;'>"
+_THUMBNAIL_OPEN = "<div style='flex: 0 0 250px;'>"
+_TAGS_OPEN = "<div style='flex: 1;'>"
+_DIV_CLOSE = "</div>"
+
+# One "original_tag: translation" line of the translations text, stripped; the tag
+# must not start with "#" (comment) and the translation may contain further colons
+_TRANSLATION_LINE = re.compile(r'^[^\S\n]*([^#\s:][^:\n]*?)[^\S\n]*:[^\S\n]*(.*?)[^\S\n]*$', re.MULTILINE)
+
+# Escapes text for element content and quoted attributes in a single pass per value
+_HTML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'})
+
+# Stylesheet for the Blocks app; the table rules cover both Svelte class hashes seen across Gradio versions
+_DEMO_CSS = """
+.output-class { display: none; }
+.results-container img { max-width: 250px; max-height: 250px; object-fit: contain; }
+.results-container a { text-decoration: none; }
+.results-container { margin-top: 10px; }
+
+/* Fix for table width issues */
+:is(table.svelte-1adtv9j, table.svelte-1tckdwi, .table-wrap table, .gradio-container table) {
+    table-layout: fixed !important;
+    width: 100% !important;
+}
+
+/* Make sure columns have appropriate widths */
+:is(table.svelte-1adtv9j, table.svelte-1tckdwi, .table-wrap table, .gradio-container table) :is(th, td):is(:first-child, :last-child) {
+    width: 50% !important;
+}
+
+/* Ensure text wraps properly */
+:is(table.svelte-1adtv9j, table.svelte-1tckdwi, .table-wrap table, .gradio-container table) td {
+    word-break: break-word !important;
+    white-space: normal !important;
+    overflow: hidden !important;
+    text-overflow: ellipsis !important;
+}
+
+/* Fix for dataframe container */
+.gradio-container [data-testid="dataframe"] {
+    overflow: hidden !important;
+    max-width: 100% !important;
+}
+
+/* Improve status message visibility */
+.gradio-container [data-testid="markdown"] {
+    font-weight: bold;
+    color: #4CAF50;
+}
+"""
+
+# Batch "Download format" choices: file name and the create_output_files keyword that writes it
+_DOWNLOAD_FORMATS = {
+    "CSV only": ('tags.csv', 'csv_path'),
+    "TXT zip": ('tags.zip', 'txt_zip_path'),
+    "Everything": ('tags_and_images.zip', 'all_zip_path'),
+}
+
+# Tag Translator file types: translate function and the suffix of the output file name
+_TRANSLATE_DISPATCH = {
+    '.txt': (utils.batch_processing.translate_txt_file, '_translated.txt'),
+    '.csv': (utils.batch_processing.translate_csv_file, '_translated.csv'),
+}
+
+# Comment block at the top of the translations text
+_TRANSLATIONS_HEADER = "# Tag Translations\n# Format: original_tag: translation\n# Use a period (.) to delete a tag\n# Leave empty to keep the original tag\n"
+
+@functools.lru_cache(maxsize=1)
+def _translated_outputs_dir() -> str:
+    """Directory the translated downloads go in, created on first use and removed when the app exits"""
+    path = tempfile.mkdtemp(prefix='autotag_translated_')
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+@functools.lru_cache(maxsize=1)
+def _load_tags_json(path: str = "tags.json") -> Tuple[Dict[str, Any], Tuple[str, ...]]:
+    """Parse tags.json once; returns the tag dict and its sorted display names."""
+    with open(path, "r") as file:
+        tags = json.load(file)
+    # Replace underscores with spaces (as done in ImageTagger)
+    return tags, tuple(tag.replace("_", " ") for tag in sorted(tags))
+
+def image_to_data_uri(image) -> str:
+    """Encode a 250px thumbnail of a PIL image as a WebP data URI"""
+    img = utils.batch_processing.make_thumbnail(image, 250)
+    with BytesIO() as buffered:
+        img.save(buffered, format="WEBP", quality=80, method=4)
+        img_str = base64.b64encode(buffered.getvalue()).decode('ascii')
+    return f"data:image/webp;base64,{img_str}"
+
+def _result_to_data_uri(result: Dict) -> str | None:
+    """Thumbnail data URI for a successful result, None for errors or results without an image.
+
+    The URI is memoized on the result, so re-rendering the same results skips the encode.
+    """
+    if 'error' in result or 'thumbnail' not in result:
+        return None
+    data_uri = result.get('data_uri')
+    if data_uri is None:
+        data_uri = result['data_uri'] = image_to_data_uri(result['thumbnail'])
+    return data_uri
+
+def format_results_as_html(results: List[Dict]) -> str:
+    """Format results as HTML with image thumbnails and tags"""
+    # Encode thumbnails in parallel, PIL releases the GIL while resizing and encoding
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        data_uris = list(executor.map(_result_to_data_uri, results))
+
+    # Add a wrapper with a specific class for styling
+    parts = [_RESULTS_OPEN]
+
+    for result, data_uri in zip(results, data_uris):
+        if 'error' in result:
+            # Handle error case
+            error_source = str(result.get('filename', result.get('url', result.get('input', 'unknown')))).translate(_HTML_ESCAPE)
+            error = str(result['error']).translate(_HTML_ESCAPE)
+            parts.append(f"<div><p>Error processing {error_source}: {error}</p></div>")
+        else:
+            name = result.get('filename', result.get('url', '')).translate(_HTML_ESCAPE)
+
+            # Use data URI for the image
+            thumbnail = ""
+            if data_uri is not None:
+                # Create clickable image that opens full size in new tab
+                source = result.get('path', result.get('url', '')).translate(_HTML_ESCAPE)
+                thumbnail = f"<a href='{source}' target='_blank'><img src='{data_uri}' style='max-width: 250px; max-height: 250px;' alt='{name}'/></a>"
+
+            # One row per result: clickable thumbnail column, then the tags column
+            parts.append(
+                f"{_ROW_OPEN}"
+                f"{_THUMBNAIL_OPEN}{thumbnail}{_DIV_CLOSE}"
+                f"{_TAGS_OPEN}<p><strong>{name}</strong></p><p>{result['tags'].translate(_HTML_ESCAPE)}</p>{_DIV_CLOSE}"
+                f"{_DIV_CLOSE}"
+            )
+
+    parts.append(_DIV_CLOSE)
+    return "".join(parts)
+
+def run_classifier(tagger, transform, images, thresholds):
+    # Batched event: concurrent Classify clicks arrive together and share one forward pass
+    indices = [index for index, image in enumerate(images) if image is not None]
+    results = [("", {})] * len(images)
+    if indices:
+        batch_results = tagger.process_image_batch(
+            [images[index] for index in indices],
+            transform,
+            [thresholds[index] for index in indices]
+        )
+        for index, result in zip(indices, batch_results):
+            results[index] = result
+    return [[tags for tags, _ in results], [scores for _, scores in results]]
+
+def image_scores_for_session(tagger, transform, image):
+    """Raw scores of the classified image, for the session's own threshold slider state.
+
+    Runs as a per-session step after the batched Classify event, since Gradio hands a
+    batched function only one session's state. The scores normally come from the
+    tagger's per-image cache, filled by the batch that just ran.
+    """
+    if image is None:
+        return None
+    return tagger.score_images([image], transform)[0]
+
+# Tag Translator Functions
+def dict_to_text(translations):
+    """Convert translations dictionary to text format."""
+    lines = []
+
+    # Add header comment
+    lines.append("# Tag Translations")
+    lines.append("# Format: original_tag: translation")
+    lines.append("# Use a period (.) to delete a tag")
+    lines.append("# Leave empty to keep the original tag")
+    lines.append("")
+
+    # Add translations
+    for original, translation in sorted(translations.items()):
+        lines.append(f"{original}: {translation}")
+
+    return "\n".join(lines)
+
+def text_to_dict(text):
+    """Convert text format to translations dictionary."""
+    translations = {}
+
+    print("Converting text to translations dictionary:")
+    print(f"Text length: {len(text)}")
+
+    # Empty lines, comments and lines without a colon or tag never match
+    for match in _TRANSLATION_LINE.finditer(text):
+        original, translation = match.groups()
+        if translation:
+            # A period means delete the tag, it is kept with "." as its value
+            translations[original] = translation
+        # Empty translation means keep the original
+
+    print(f"Parsed {len(translations)} translation entries")
+    return translations
+
+def load_all_tags():
+    """Load all tags from tags.json with empty translations."""
+    try:
+        tags, display_tags = _load_tags_json()
+
+        # Write all tags with empty translations straight into one buffer
+        text = StringIO()
+        text.write(_TRANSLATIONS_HEADER)
+        for display_tag in display_tags:
+            text.write("\n")
+            text.write(display_tag)
+            text.write(": ")
+
+        return text.getvalue(), f"Loaded all {len(tags)} tags from tags.json"
+    except Exception as e:
+        return "# Error loading tags", f"Error loading tags: {str(e)}"
+
+def load_translations_file(file_path):
+    """Load translations from a CSV file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header or len(header) < 2:
+                return {}, "Invalid CSV format. Expected at least 2 columns."
+
+            # Only store non-empty translations
+            translations = dict((row[0], row[1]) for row in reader if len(row) >= 2 and row[1] and not row[1].isspace())
+
+        return translations, f"Loaded {len(translations)} translations successfully."
+    except Exception as e:
+        return {}, f"Error loading translations: {str(e)}"
+
+def load_translations_text(file_path):
+    """Load translations from a CSV file and convert to text format."""
+    translations, message = load_translations_file(file_path)
+    text = dict_to_text(translations)
+    return text, message
+
+def save_translations_text(text):
+    """Convert text to translations dictionary and save to a CSV file."""
+    translations = text_to_dict(text)
+
+    if not translations:
+        return None, "No translations to save. Please add some translations first."
+
+    temp_file = tempfile.mktemp(suffix='.csv')
+    status_message = save_translations_file(temp_file, translations)
+
+    return temp_file, status_message
+
+def save_translations_file(file_path, translations):
+    """Save translations to a CSV file."""
+    try:
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["original", "translation"])
+            for original, translation in translations.items():
+                writer.writerow([original, translation])
+
+        return f"Saved {len(translations)} translations to {file_path}"
+    except Exception as e:
+        return f"Error saving translations: {str(e)}"
+
+def apply_translations_to_file(file_path, text):
+    """Apply translations from text to a file."""
+    print(f"apply_translations_to_file called with file_path: {file_path}")
+    print(f"Text length: {len(text)}")
+
+    translations = text_to_dict(text)
+    print(f"Parsed {len(translations)} translations from text")
+
+    if not translations:
+        print("No translations to apply")
+        return None, "No translations to apply. Please add some translations first."
+
+    print(f"Calling process_translate_file with {len(translations)} translations")
+    return process_translate_file(file_path, translations)
+
+def process_translate_file(file_path, translations):
+    """Translate tags in a file (TXT or CSV)."""
+    print(f"process_translate_file called with file_path: {file_path}")
+    print(f"Number of translations: {len(translations)}")
+
+    try:
+        # One stat for the existence and regular-file checks
+        try:
+            is_file = bool(file_path) and stat.S_ISREG(os.stat(file_path).st_mode)
+        except OSError:
+            is_file = False
+        if not is_file:
+            print(f"Invalid file path: {file_path}")
+            return None, "Invalid file path"
+
+        if not translations:
+            print("No translations provided")
+            return None, "No translations provided"
+
+        ext = os.path.splitext(file_path)[1].lower()
+        print(f"File extension: {ext}")
+
+        entry = _TRANSLATE_DISPATCH.get(ext)
+        if entry is None:
+            print(f"Unsupported file type: {ext}")
+            return None, f"Unsupported file type: {ext}"
+        translate_fn, suffix = entry
+        kind = ext[1:].upper()
+
+        # Create a temporary directory for the output file
+        temp_dir = tempfile.mkdtemp(dir=_translated_outputs_dir())
+        print(f"Created temporary directory: {temp_dir}")
+
+        print(f"Processing {kind} file")
+        translated_content = translate_fn(file_path, translations)
+        output_filename = os.path.splitext(os.path.basename(file_path))[0] + suffix
+        output_path = os.path.join(temp_dir, output_filename)
+        print(f"Writing translated content to: {output_path}")
+        print(f"Translated content size: {len(translated_content)} bytes")
+
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(translated_content)
+
+        print(f"{kind} file created: {output_path}")
+        return output_path, f"Translated {kind} file created"
+
+    except Exception as e:
+        import traceback
+        print(f"Error translating file: {str(e)}")
+        print(traceback.format_exc())
+        return None, f"Error translating file: {str(e)}"
+
+def process_translate_folder(folder_path, translations):
+    """Translate all TXT files in a folder."""
+    try:
+        if not folder_path or not os.path.isdir(folder_path):
+            return None, "Invalid folder path"
+
+        if not translations:
+            return None, "No translations provided"
+
+        results = utils.batch_processing.translate_txt_folder(folder_path, translations)
+
+        if not results:
+            return None, "No TXT files found in the folder"
+
+        # Create a zip file with translated TXT files
+        temp_dir = tempfile.mkdtemp(dir=_translated_outputs_dir())
+        zip_path = os.path.join(temp_dir, 'translated_tags.zip')
+        utils.batch_processing.create_translated_txt_files_zip(zip_path, results)
+
+        return zip_path, f"Translated {len(results)} TXT files"
+
+    except Exception as e:
+        return None, f"Error translating folder: {str(e)}"
+
+def create_interface(
+    tagger,
+    transform,
+    process_folder_fn,
+    process_urls_fn,
+    process_urls_or_paths_fn,
+    format_csv_fn,
+    create_csv_file_fn,
+    create_txt_files_zip_fn,
+    create_txt_and_images_zip_fn,
+    create_output_files_fn=None
+):
+    """Create the Gradio interface with tabs for single and batch processing"""
+    print("Starting create_interface function")
+
+    # One cancellation flag per browser session, so Cancel only stops that session's job
+    cancel_events = {}
+
+    def get_cancel_event(request):
+        session_hash = request.session_hash if request is not None else None
+        return cancel_events.setdefault(session_hash, threading.Event())
+
+    # Downloads of every request go in one directory that is removed when the app exits
+    downloads_dir = tempfile.mkdtemp(prefix='autotag_')
+    atexit.register(shutil.rmtree, downloads_dir, ignore_errors=True)
+
+    # Directory holding the downloaded images of each session's kept results, per tab
+    spill_dirs = {}
+
+    def forget_session(request: gr.Request):
+        cancel_events.pop(request.session_hash, None)
+        for spill_dir in spill_dirs.pop(request.session_hash, {}).values():
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def create_download_files(results):
+        """Write the CSV and both zips for one request into a directory of their own"""
+        request_dir = tempfile.mkdtemp(dir=downloads_dir)
+        csv_file_path = os.path.join(request_dir, 'tags.csv')
+        txt_zip_path = os.path.join(request_dir, 'tags.zip')
+        all_zip_path = os.path.join(request_dir, 'tags_and_images.zip')
+
+        if create_output_files_fn is not None:
+            # All three files from one pass over the results
+            create_output_files_fn(results, csv_file_path, txt_zip_path, all_zip_path)
+            return csv_file_path, txt_zip_path, all_zip_path
+
+        # Create downloadable files
+        create_csv_file_fn(csv_file_path, format_csv_fn(results))
+
+        # Create TXT files zip
+        create_txt_files_zip_fn(txt_zip_path, results)
+
+        # Create TXT and images zip
+        create_txt_and_images_zip_fn(all_zip_path, results)
+
+        return csv_file_path, txt_zip_path, all_zip_path
+
+    def create_download_file(results, download_format):
+        """Write only the file picked in the Download format radio"""
+        if not results:
+            return None
+        file_name, keyword = _DOWNLOAD_FORMATS[download_format]
+        path = os.path.join(tempfile.mkdtemp(dir=downloads_dir), file_name)
+
+        try:
+            if create_output_files_fn is not None:
+                create_output_files_fn(results, **{keyword: path})
+            elif keyword == 'csv_path':
+                create_csv_file_fn(path, format_csv_fn(results))
+            elif keyword == 'txt_zip_path':
+                create_txt_files_zip_fn(path, results)
+            else:
+                create_txt_and_images_zip_fn(path, results)
+        except Exception as e:
+            # e.g. a source image was moved or deleted since the folder was processed
+            print(f"Error creating {file_name}: {str(e)}")
+            gr.Warning(f"Could not create {file_name}: {str(e)}")
+            return None
+        return path
+
+    def create_all_download_files(results):
+        if not results:
+            return None, None, None
+        try:
+            return create_download_files(results)
+        except Exception as e:
+            print(f"Error creating download files: {str(e)}")
+            gr.Warning(f"Could not create the download files: {str(e)}")
+            return None, None, None
+
+    def results_for_state(results, request, tab):
+        """Copy of the results to keep in the session state for later downloads.
+
+        Downloaded image bytes are written to a file under downloads_dir and referenced
+        by 'path', so the state does not hold up to MAX_DOWNLOAD_BYTES per URL in memory
+        for as long as the session lives. The files of the results this replaces in the
+        tab are removed.
+        """
+        session_hash = request.session_hash if request is not None else None
+        session_dirs = spill_dirs.setdefault(session_hash, {})
+        old_dir = session_dirs.pop(tab, None)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        spill_dir = None
+        kept = []
+        for index, result in enumerate(results):
+            if 'data' in result:
+                if spill_dir is None:
+                    spill_dir = tempfile.mkdtemp(dir=downloads_dir)
+                result = {key: value for key, value in result.items() if key != 'data'}
+                result['path'] = os.path.join(spill_dir, str(index))
+                with open(result['path'], 'wb') as file:
+                    file.write(results[index]['data'])
+            kept.append(result)
+        if spill_dir is not None:
+            session_dirs[tab] = spill_dir
+        return kept
+
+    # Batch processing functions
+    def process_folder_path(folder_path, threshold, download_format, request: gr.Request, progress=gr.Progress()):
+        import os
+        if not folder_path or not os.path.isdir(folder_path):
+            return "<p>Invalid folder path</p>", None, results_for_state([], request, 'folder'), None, None, None
+
+        # Reset cancellation state at the start of processing
+        cancel_event = get_cancel_event(request)
+        cancel_event.clear()
+
+        def progress_callback(current, total):
+            progress(current/total, f"Processing image {current}/{total}")
+            # Check the cancel_processing state
+            return not cancel_event.is_set()
+
+        results = process_folder_fn(folder_path, tagger, transform, threshold, progress_callback)
+
+        html_output = format_results_as_html(results)
+
+        # The Advanced files are cleared until asked for again
+        return html_output, create_download_file(results, download_format), results_for_state(results, request, 'folder'), None, None, None
+
+    def process_url_list(url_list, threshold, download_format, request: gr.Request, progress=gr.Progress()):
+        if not url_list:
+            return "<p>No URLs provided</p>", None, results_for_state([], request, 'url'), None, None, None
+
+        # Reset cancellation state at the start of processing
+        cancel_event = get_cancel_event(request)
+        cancel_event.clear()
+
+        def progress_callback(current, total):
+            progress(current/total, f"Processing URL {current}/{total}")
+            # Check the cancel_processing state
+            return not cancel_event.is_set()
+
+        results = process_urls_fn(url_list.split('\n'), tagger, transform, threshold, progress_callback)
+
+        html_output = format_results_as_html(results)
+
+        # The Advanced files are cleared until asked for again
+        return html_output, create_download_file(results, download_format), results_for_state(results, request, 'url'), None, None, None
+
+    def process_url_or_path_list(input_list, threshold, download_format, request: gr.Request, progress=gr.Progress()):
+        if not input_list:
+            return "<p>No URLs or paths provided</p>", None, results_for_state([], request, 'url'), None, None, None
+
+        # Reset cancellation state at the start of processing
+        cancel_event = get_cancel_event(request)
+        cancel_event.clear()
+
+        def progress_callback(current, total):
+            progress(current/total, f"Processing item {current}/{total}")
+            # Check the cancel_processing state
+            return not cancel_event.is_set()
+
+        results = process_urls_or_paths_fn(input_list.split('\n'), tagger, transform, threshold, progress_callback)
+
+        html_output = format_results_as_html(results)
+
+        # The Advanced files are cleared until asked for again
+        return html_output, create_download_file(results, download_format), results_for_state(results, request, 'url'), None, None, None
+
+    # Create the interface
+    print("Creating Gradio Blocks")
+    with gr.Blocks(css=_DEMO_CSS) as demo:
+        gr.Markdown("""
+        ## Joint Tagger Project: JTP-PILOT² Demo **BETA**
+        This tagger is designed for use on furry images (though may very well work on out-of-distribution images, potentially with funny results).  A threshold of 0.2 is recommended.  Lower thresholds often turn up more valid tags, but can also result in some amount of hallucinated tags.
+        This tagger is the result of joint efforts between members of the RedRocket team, with distinctions given to Thessalo for creating the foundation for this project with his efforts, RedHotTensors for redesigning the process into a second-order method that models information expectation, and drhead for dataset prep, creation of training code and supervision of training runs.
+        Special thanks to Minotoro at frosting.ai for providing the compute power for this project.
+        """)
+
+        with gr.Tabs():
+            # Single Image Tab
+            with gr.TabItem("Single Image"):
+                with gr.Row():
+                    with gr.Column():
+                        image_input = gr.Image(label="Source", sources=['upload'], type='pil', height=512, show_label=False)
+                        threshold_slider = gr.Slider(minimum=0.00, maximum=1.00, step=0.01, value=0.20, label="Threshold")
+                    with gr.Column():
+                        tag_string = gr.Textbox(label="Tag String")
+                        label_box = gr.Label(label="Tag Predictions", num_top_classes=250, show_label=False)
+
+                with gr.Row():
+                    classify_btn = gr.Button("Classify", variant="primary")
+                    clear_btn = gr.Button("Clear")
+
+                # Scores of this session's last classified image
+                image_scores = gr.State()
+
+                # Set up event handlers for single image processing
+                classify_btn.click(
+                    fn=functools.partial(run_classifier, tagger, transform),
+                    inputs=[image_input, threshold_slider],
+                    outputs=[tag_string, label_box],
+                    batch=True,
+                    max_batch_size=8,
+                    api_name="run_classifier"
+                ).then(
+                    fn=functools.partial(image_scores_for_session, tagger, transform),
+                    inputs=[image_input],
+                    outputs=[image_scores],
+                    show_api=False
+                )
+
+                clear_btn.click(
+                    fn=lambda: (None, "", {}, None),
+                    inputs=[],
+                    outputs=[image_input, tag_string, label_box, image_scores],
+                    api_name="clear_image"
+                )
+
+                threshold_slider.input(
+                    fn=tagger.create_tags,
+                    inputs=[image_scores, threshold_slider],
+                    outputs=[tag_string, label_box]
+                )
+
+            # Batch Processing Tab
+            with gr.TabItem("Batch Processing"):
+                gr.Markdown("""
+                ### ⚠️ Warning
+                Avoid processing more than 100 images at once to prevent memory issues and long processing times.
+                """)
+
+                with gr.Row():
+                    batch_threshold = gr.Slider(minimum=0.00, maximum=1.00, step=0.01, value=0.20, label="Threshold")
+
+                with gr.Tabs():
+                    # Folder Processing Tab
+                    with gr.TabItem("Process Folder"):
+                        folder_path = gr.Textbox(label="Folder Path", placeholder="Enter folder path containing images")
+
+                        with gr.Row():
+                            process_folder_btn = gr.Button("Process Folder", variant="primary")
+                            cancel_folder_btn = gr.Button("Cancel", variant="stop")
+
+                        with gr.Row():
+                            gr.Markdown("### Download Options")
+
+                        with gr.Row():
+                            folder_format = gr.Radio(list(_DOWNLOAD_FORMATS), value="Everything", label="Download format")
+                            folder_download = gr.File(label="Download", visible=True, interactive=False)
+
+                        with gr.Accordion("Advanced", open=False):
+                            folder_all_files_btn = gr.Button("Create all download files")
+                            with gr.Row():
+                                folder_csv = gr.File(label="CSV File", visible=True, interactive=False)
+                                folder_txt_zip = gr.File(label="TXT Files (ZIP)", visible=True, interactive=False)
+                                folder_all_zip = gr.File(label="TXT + Images (ZIP)", visible=True, interactive=False)
+
+                        folder_results = gr.State()
+
+                        folder_output = gr.HTML(label="Results")
+
+                        # Process folder button
+                        process_folder_btn.click(
+                            fn=process_folder_path,
+                            inputs=[folder_path, batch_threshold, folder_format],
+                            outputs=[folder_output, folder_download, folder_results, folder_csv, folder_txt_zip, folder_all_zip],
+                            concurrency_limit=1
+                        )
+
+                        # Switching format rewrites the download from the last results
+                        folder_format.change(
+                            fn=create_download_file,
+                            inputs=[folder_results, folder_format],
+                            outputs=folder_download
+                        )
+
+                        folder_all_files_btn.click(
+                            fn=create_all_download_files,
+                            inputs=folder_results,
+                            outputs=[folder_csv, folder_txt_zip, folder_all_zip]
+                        )
+
+                        # Function to set the cancellation flag
+                        def set_cancelled(request: gr.Request):
+                            get_cancel_event(request).set()
+                            return "Cancelling..."
+
+                        # Cancel button
+                        cancel_folder_btn.click(
+                            fn=set_cancelled,
+                            inputs=[],
+                            outputs=[gr.Textbox(visible=False)]
+                        )
+
+                    # URL and Path Processing Tab
+                    with gr.TabItem("Process URLs/Paths"):
+                        url_input = gr.Textbox(
+                            label="Image URLs or Paths",
+                            placeholder="Enter one URL or file path per line\nURLs must start with http:// or https://\nPaths can be absolute (e.g., C:\\Images\\pic.png or /home/user/images/pic.jpg)",
+                            lines=5
+                        )
+
+                        with gr.Row():
+                            process_url_btn = gr.Button("Process URLs/Paths", variant="primary")
+                            cancel_url_btn = gr.Button("Cancel", variant="stop")
+
+                        with gr.Row():
+                            gr.Markdown("### Download Options")
+
+                        with gr.Row():
+                            url_format = gr.Radio(list(_DOWNLOAD_FORMATS), value="Everything", label="Download format")
+                            url_download = gr.File(label="Download", visible=True, interactive=False)
+
+                        with gr.Accordion("Advanced", open=False):
+                            url_all_files_btn = gr.Button("Create all download files")
+                            with gr.Row():
+                                url_csv = gr.File(label="CSV File", visible=True, interactive=False)
+                                url_txt_zip = gr.File(label="TXT Files (ZIP)", visible=True, interactive=False)
+                                url_all_zip = gr.File(label="TXT + Images (ZIP)", visible=True, interactive=False)
+
+                        url_results = gr.State()
+
+                        url_output = gr.HTML(label="Results")
+
+                        # Process URLs/Paths button
+                        process_url_btn.click(
+                            fn=process_url_or_path_list,
+                            inputs=[url_input, batch_threshold, url_format],
+                            outputs=[url_output, url_download, url_results, url_csv, url_txt_zip, url_all_zip],
+                            concurrency_limit=1
+                        )
+
+                        # Switching format rewrites the download from the last results
+                        url_format.change(
+                            fn=create_download_file,
+                            inputs=[url_results, url_format],
+                            outputs=url_download
+                        )
+
+                        url_all_files_btn.click(
+                            fn=create_all_download_files,
+                            inputs=url_results,
+                            outputs=[url_csv, url_txt_zip, url_all_zip]
+                        )
+
+                        # Cancel button
+                        cancel_url_btn.click(
+                            fn=set_cancelled,
+                            inputs=[],
+                            outputs=[gr.Textbox(visible=False)]
+                        )
+
+                # Drop a session's cancellation flag and kept downloads once its tab is closed
+                demo.unload(forget_session)
+
+            # Tag Translator Tab
+            with gr.TabItem("Tag Translator"):
+                gr.Markdown("""
+                ## Tag Translator
+                This tab allows you to create and apply tag translations. You can:
+                - View and edit translations for tags
+                - Save translations to a CSV file
+                - Load translations from a CSV file
+                - Apply translations to TXT or CSV files
+                """)
+
+                with gr.Tabs():
+                    # Translation Management Tab
+                    with gr.TabItem("Manage Translations"):
+                        gr.Markdown("""
+                        ### Tag Translation Management
+
+                        Edit translations in the text area below using the following format:
+
+                        ```
+                        original_tag: translation
+                        ```
+
+                        Special syntax:
+                        - `original_tag: translation` - Translate a tag
+                        - `original_tag: .` - Delete a tag
+                        - `original_tag:` - Keep the original tag (no translation)
+                        - `# Comment` - Add comments (will be ignored)
+
+                        Example:
+                        ```
+                        # My translations
+                        anthro: anthropomorphic
+                        female: female_character
+                        male: male_character
+                        # Delete this tag
+                        unwanted_tag: .
+                        ```
+
+                        Tips:
+                        - Use your text editor's search function (Ctrl+F) to find specific tags
+                        - Save your translations regularly
+                        """)
+
+                        # Text area for editing translations
+                        translation_text = gr.Textbox(
+                            label="Edit Translations",
+                            placeholder="Enter translations in the format 'original_tag: translation' (one per line)",
+                            lines=20,
+                            max_lines=30,
+                            interactive=True
+                        )
+
+                        # Controls
+                        with gr.Row():
+                            load_all_tags_btn = gr.Button("Load All Tags")
+                            load_btn = gr.Button("Load Translations")
+                            save_btn = gr.Button("Save Translations")
+                            translation_file = gr.File(label="Translation CSV File", file_types=[".csv"])
+
+                        # Status message
+                        translation_status = gr.Markdown("")
+
+                        # Load all tags button handler
+                        load_all_tags_btn.click(
+                            fn=load_all_tags,
+                            inputs=[],
+                            outputs=[translation_text, translation_status]
+                        )
+
+                        # Load translations from file
+                        load_btn.click(
+                            fn=lambda file: load_translations_text(file.name) if file else ("", "No file selected"),
+                            inputs=[translation_file],
+                            outputs=[translation_text, translation_status]
+                        )
+
+                        # Save translations to file
+                        save_btn.click(
+                            fn=save_translations_text,
+                            inputs=[translation_text],
+                            outputs=[translation_file, translation_status]
+                        )
+
+                    # Apply Translations Tab
+                    with gr.TabItem("Apply Translations"):
+                        gr.Markdown("""
+                        ### Apply Translations to Files
+                        - Upload a TXT or CSV file to apply translations
+                        - For CSV files, translations are applied only to the tags column
+                        - For TXT files, you can also process a folder containing multiple TXT files
+
+                        The translations from the "Manage Translations" tab will be used.
+                        """)
+
+                        # Status message
+                        apply_status = gr.Markdown("")
+
+                        # File input options
+                        with gr.Tabs():
+                            # Single file option
+                            with gr.TabItem("Single File"):
+                                input_file = gr.File(label="Input File (TXT/CSV)", file_types=[".txt", ".csv"])
+                                translate_file_btn = gr.Button("Translate File")
+                                translated_file = gr.File(label="Translated File", interactive=False)
+
+                                # Translate single file
+                                translate_file_btn.click(
+                                    fn=lambda file, text: apply_translations_to_file(file.name if file else None, text),
+                                    inputs=[input_file, translation_text],
+                                    outputs=[translated_file, apply_status]
+                                )
+
+                            # Folder option (for TXT files)
+                            with gr.TabItem("Folder (TXT files only)"):
+                                folder_path_translate = gr.Textbox(label="Folder Path", placeholder="Enter folder path containing TXT files")
+                                translate_folder_btn = gr.Button("Translate Folder")
+                                translated_zip = gr.File(label="Translated Files (ZIP)", interactive=False)
+
+                                # Translate folder
+                                translate_folder_btn.click(
+                                    fn=lambda folder, text: process_translate_folder(folder, text_to_dict(text)),
+                                    inputs=[folder_path_translate, translation_text],
+                                    outputs=[translated_zip, apply_status]
+                                )
+
+    # Batch jobs run one at a time per tab (see concurrency_limit above), everything
+    # else can overlap so single images and cancels aren't stuck behind a folder job
+    demo.queue(default_concurrency_limit=max(2, (os.cpu_count() or 4) // 2), max_size=32)
+
+    print("Returning demo:", demo)
     return demo
\ No newline at end of file
@@ -1,633 +1,798 @@
-import os
-import csv
-import requests
-from PIL import Image
-from io import BytesIO, StringIO
-import tempfile
-import zipfile
-import shutil
-from typing import List, Dict, Tuple, Optional, Callable
-
-def get_supported_extensions() -> List[str]:
-    return ['.jpg', '.jpeg', '.png', '.bmp', '.webp']
-
-def is_valid_url(url: str) -> bool:
-    """Basic validation to check if URL has http/https prefix"""
-    return url.startswith('http://') or url.startswith('https://')
-
-def is_valid_path(path: str) -> bool:
-    """Check if a string is a valid file path"""
-    if not path:
-        return False
-
-    # Check if the file exists
-    if not os.path.isfile(path):
-        return False
-
-    # Check if it has a supported extension
-    ext = os.path.splitext(path)[1].lower()
-    return ext in get_supported_extensions()
-
-def process_urls_or_paths(
-    inputs: List[str],
-    tagger,
-    transform,
-    threshold: float,
-    progress_callback: Optional[Callable[[int, int], bool]] = None
-) -> List[Dict]:
-    """Process images from a list of URLs or file paths and return results"""
-    # Create a mapping to track original order
-    input_map = {}
-    valid_inputs = []
-    results_dict = {}
-
-    # Separate URLs and file paths while preserving order
-    urls = []
-    file_paths = []
-
-    for idx, input_str in enumerate(inputs):
-        input_str = input_str.strip()
-        if not input_str:
-            continue
-
-        input_map[input_str] = idx
-
-        if is_valid_url(input_str):
-            urls.append(input_str)
-            valid_inputs.append(input_str)
-        elif is_valid_path(input_str):
-            file_paths.append(input_str)
-            valid_inputs.append(input_str)
-        else:
-            # Invalid input - add directly to results_dict
-            results_dict[input_str] = {
-                'input': input_str,
-                'error': "Invalid URL or file path"
-            }
-
-    # Calculate total items for progress
-    total_items = len(urls) + len(file_paths)
-    processed_count = 0
-
-    # Process URLs
-    if urls:
-        for url in urls:
-            processed_count += 1
-            if progress_callback:
-                continue_processing = progress_callback(processed_count, total_items)
-                if not continue_processing:
-                    # Processing was cancelled
-                    break
-
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-
-                image = Image.open(BytesIO(response.content))
-                tags, scores = tagger.process_image(image, transform, threshold)
-
-                results_dict[url] = {
-                    'url': url,
-                    'tags': tags,
-                    'scores': scores,
-                    'image': image.copy()  # Store a copy of the image for thumbnail display
-                }
-            except Exception as e:
-                results_dict[url] = {
-                    'url': url,
-                    'error': str(e)
-                }
-
-    # Process file paths in batches
-    batch_size = 8
-    continue_processing = True
-    
-    for i in range(0, len(file_paths), batch_size):
-        if not continue_processing:
-            break
-            
-        batch_paths = file_paths[i:i+batch_size]
-        batch_images = []
-        batch_errors = []
-        
-        # Load batch of images
-        for file_path in batch_paths:
-            processed_count += 1
-            if progress_callback:
-                continue_processing = progress_callback(processed_count, total_items)
-                if not continue_processing:
-                    break
-            
-            try:
-                image = Image.open(file_path)
-                batch_images.append((file_path, image))
-            except Exception as e:
-                batch_errors.append((file_path, str(e)))
-        
-        # Handle individual image loading errors
-        for file_path, error in batch_errors:
-            results_dict[file_path] = {
-                'path': file_path,
-                'filename': os.path.basename(file_path),
-                'error': error
-            }
-        
-        # Skip if no images or processing was cancelled
-        if not batch_images or not continue_processing:
-            continue
-            
-        # Prepare batch data
-        paths = [item[0] for item in batch_images]
-        images = [item[1] for item in batch_images]
-        
-        try:
-            # Process the batch
-            batch_results = tagger.process_images(images, transform, threshold)
-            
-            # Store successful results
-            for idx, (tags, scores) in enumerate(batch_results):
-                results_dict[paths[idx]] = {
-                    'path': paths[idx],
-                    'filename': os.path.basename(paths[idx]),
-                    'tags': tags,
-                    'scores': scores,
-                    'image': images[idx].copy()
-                }
-        except Exception as e:
-            # Handle batch processing errors
-            error_msg = f"Batch processing error: {str(e)}"
-            for file_path in paths:
-                results_dict[file_path] = {
-                    'path': file_path,
-                    'filename': os.path.basename(file_path),
-                    'error': error_msg
-                }
-        except Exception as e:
-            results_dict[file_path] = {
-                'path': file_path,
-                'filename': os.path.basename(file_path),
-                'error': str(e)
-            }
-
-    # Reconstruct results in original order
-    results = []
-    for input_str in inputs:
-        input_str = input_str.strip()
-        if not input_str:
-            continue
-
-        if input_str in results_dict:
-            results.append(results_dict[input_str])
-
-    return results
-
-def process_folder(
-    folder_path: str,
-    tagger,
-    transform,
-    threshold: float,
-    progress_callback: Optional[Callable[[int, int], bool]] = None
-) -> List[Dict]:
-    """Process all images in a folder and return results"""
-    results = []
-    supported_extensions = get_supported_extensions()
-
-    try:
-        # Get list of files first
-        image_files = []
-        for filename in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, filename)
-            ext = os.path.splitext(filename)[1].lower()
-
-            if os.path.isfile(file_path) and ext in supported_extensions:
-                image_files.append((filename, file_path))
-
-        # Process each file with progress updates
-        total_files = len(image_files)
-        for i, (filename, file_path) in enumerate(image_files):
-            try:
-                # Update progress and check for cancellation
-                if progress_callback:
-                    continue_processing = progress_callback(i + 1, total_files)
-                    if not continue_processing:
-                        # Processing was cancelled
-                        break
-
-                image = Image.open(file_path)
-                tags, scores = tagger.process_image(image, transform, threshold)
-                results.append({
-                    'filename': filename,
-                    'path': file_path,
-                    'tags': tags,
-                    'scores': scores,
-                    'image': image.copy()  # Store a copy of the image for thumbnail display
-                })
-            except Exception as e:
-                results.append({
-                    'filename': filename,
-                    'path': file_path,
-                    'error': str(e)
-                })
-    except Exception as e:
-        return [{'error': f"Error processing folder: {str(e)}"}]
-
-    return results
-
-def process_urls(
-    urls: List[str],
-    tagger,
-    transform,
-    threshold: float,
-    progress_callback: Optional[Callable[[int, int], bool]] = None,
-    max_workers: int = 4,
-    request_delay: float = 0.5
-) -> List[Dict]:
-    """Process images from a list of URLs with rate limiting and parallel processing"""
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    import time
-    from queue import Queue
-
-    results = []
-    total_urls = len(urls)
-    url_queue = Queue()
-    last_request_time = 0
-
-    # Worker function with rate limiting
-    def process_single_url(url: str) -> Dict:
-        nonlocal last_request_time
-        current_time = time.time()
-        elapsed = current_time - last_request_time
-        
-        # Enforce rate limiting
-        if elapsed < request_delay:
-            time.sleep(request_delay - elapsed)
-        
-        try:
-            last_request_time = time.time()
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-
-            image = Image.open(BytesIO(response.content))
-            tags, scores = tagger.process_image(image, transform, threshold)
-
-            return {
-                'url': url,
-                'tags': tags,
-                'scores': scores,
-                'image': image.copy()
-            }
-        except Exception as e:
-            return {
-                'url': url,
-                'error': str(e)
-            }
-
-    # Process URLs with thread pool
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_single_url, url): url for url in urls}
-        
-        for i, future in enumerate(as_completed(futures)):
-            if progress_callback:
-                continue_processing = progress_callback(i + 1, total_urls)
-                if not continue_processing:
-                    # Cancel remaining futures
-                    for f in futures:
-                        f.cancel()
-                    break
-            
-            try:
-                results.append(future.result())
-            except Exception as e:
-                results.append({
-                    'url': futures[future],
-                    'error': str(e)
-                })
-
-    return results
-
-def format_results_as_csv(results: List[Dict]) -> str:
-    """Format the results as a CSV string with semi-colon delimiter"""
-    output = []
-    # Add header
-    output.append("image_url;tags")
-    
-    # Process each result
-    for result in results:
-        if 'error' in result:
-            # Handle error case
-            source = result.get('filename', result.get('url', result.get('input', 'unknown')))
-            output.append(f"{source};ERROR: {result['error']}")
-        else:
-            # Handle success case
-            source = result.get('filename', result.get('url', result.get('path', 'unknown')))
-            tags_str = result.get('tags', '')
-            output.append(f"{source};{tags_str}")
-    
-    return '\n'.join(output)
-
-def save_csv_to_file(output_path: str, csv_content: str) -> None:
-    """Save CSV content to a file"""
-    import os
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-        csvfile.write(csv_content)
-
-def create_txt_files_zip(output_path: str, results: List[Dict]) -> None:
-    """Create a zip file containing text files with tags and scores"""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for result in results:
-            if 'error' not in result:
-                filename = os.path.splitext(os.path.basename(result.get('filename', result.get('url', 'unknown'))))[0] + '.txt'
-                file_path = os.path.join(temp_dir, filename)
-                with open(file_path, 'w', encoding='utf-8') as txtfile:
-                    txtfile.write(result['tags'])
-
-        with zipfile.ZipFile(output_path, 'w') as zipf:
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    zipf.write(os.path.join(root, file), file)
-
-def create_txt_and_images_zip(output_path: str, results: List[Dict]) -> None:
-    """Create a zip file containing text files with tags and scores and images"""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for result in results:
-            if 'error' not in result:
-                txt_filename = os.path.splitext(os.path.basename(result.get('filename', result.get('url', 'unknown'))))[0] + '.txt'
-                txt_file_path = os.path.join(temp_dir, txt_filename)
-                with open(txt_file_path, 'w', encoding='utf-8') as txtfile:
-                    txtfile.write(result['tags'])
-
-                img_filename = os.path.splitext(os.path.basename(result.get('filename', result.get('url', 'unknown'))))[0] + '.png'
-                img_file_path = os.path.join(temp_dir, img_filename)
-                result['image'].save(img_file_path, 'PNG')
-
-        with zipfile.ZipFile(output_path, 'w') as zipf:
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    zipf.write(os.path.join(root, file), file)
-
-# Tag Translation Functions
-
-def load_translations_from_csv(file_path: str) -> Dict[str, str]:
-    """Load translations from a CSV file.
-    
-    Args:
-        file_path: Path to the CSV file
-        
-    Returns:
-        Dictionary mapping original tags to their translations
-    """
-    translations = {}
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        next(reader, None)  # Skip header
-        for row in reader:
-            if len(row) >= 2 and row[1].strip():  # Only store non-empty translations
-                translations[row[0]] = row[1]
-    return translations
-
-def save_translations_to_csv(file_path: str, translations: Dict[str, str]) -> None:
-    """Save translations to a CSV file.
-    
-    Args:
-        file_path: Path to save the CSV file
-        translations: Dictionary mapping original tags to their translations
-    """
-    with open(file_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(["original", "translation"])
-        for original, translation in translations.items():
-            writer.writerow([original, translation])
-
-def apply_translations(text: str, translations: Dict[str, str]) -> str:
-    """Apply translations to a comma-separated string of tags.
-    
-    Args:
-        text: Comma-separated string of tags
-        translations: Dictionary mapping original tags to their translations
-        
-    Returns:
-        Translated comma-separated string of tags
-    """
-    print(f"Applying translations to: '{text}'")
-    print(f"Translations dictionary: {translations}")
-    
-    # Handle empty input
-    if not text.strip():
-        return ""
-    
-    # Split the input text into individual tags
-    tags = [tag.strip() for tag in text.split(',') if tag.strip()]
-    print(f"Split tags: {tags}")
-    
-    # Process each tag according to the translations
-    translated_tags = []
-    for tag in tags:
-        print(f"Processing tag: '{tag}'")
-        if tag in translations:
-            translation = translations[tag]
-            print(f"  Found translation: '{translation}'")
-            if translation == '.':  # Special character for deletion
-                print(f"  Deleting tag '{tag}'")
-                # Skip this tag entirely
-            else:
-                # Add all translated tags (may be multiple comma-separated tags)
-                translated_parts = [t.strip() for t in translation.split(',') if t.strip()]
-                print(f"  Adding translated parts: {translated_parts}")
-                translated_tags.extend(translated_parts)
-        else:
-            # Keep original tag if no translation exists
-            print(f"  No translation found, keeping original: '{tag}'")
-            translated_tags.append(tag)
-    
-    # Join the translated tags with commas
-    result = ', '.join(translated_tags) if translated_tags else ""
-    print(f"Final translated result: '{result}'")
-    return result
-
-def translate_txt_file(input_path: str, translations: Dict[str, str]) -> str:
-    """Translate tags in a TXT file.
-    
-    Args:
-        input_path: Path to the TXT file
-        translations: Dictionary mapping original tags to their translations
-        
-    Returns:
-        Translated content as a string
-    """
-    with open(input_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    translated_content = apply_translations(content, translations)
-    
-    return translated_content
-
-def translate_csv_file(input_path: str, translations: Dict[str, str]) -> str:
-    """Translate tags in a CSV file (only the 'tags' column).
-    
-    Args:
-        input_path: Path to the CSV file
-        translations: Dictionary mapping original tags to their translations
-        
-    Returns:
-        Translated content as a string
-    """
-    print(f"Translating CSV file: {input_path}")
-    print(f"Number of translations: {len(translations)}")
-    
-    # Read the entire file as text
-    with open(input_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Make a copy of the original content
-    original_content = content
-    
-    # First, detect the delimiter
-    delimiter = ','  # Default to comma
-    for possible_delimiter in [',', ';', '\t', '|']:
-        if possible_delimiter in content.split('\n')[0]:
-            delimiter = possible_delimiter
-            break
-    
-    print(f"Using delimiter: '{delimiter}'")
-    
-    # Split the content into lines
-    lines = content.split('\n')
-    if not lines:
-        print("Empty file")
-        return ""
-    
-    # Parse the header to find the tags column
-    header_line = lines[0]
-    # Handle quoted headers
-    header_parts = []
-    in_quotes = False
-    current_part = ""
-    for char in header_line:
-        if char == '"':
-            in_quotes = not in_quotes
-            current_part += char
-        elif char == delimiter and not in_quotes:
-            header_parts.append(current_part)
-            current_part = ""
-        else:
-            current_part += char
-    header_parts.append(current_part)  # Add the last part
-    
-    # Find the tags column
-    tags_col_idx = -1
-    for i, col in enumerate(header_parts):
-        # Remove quotes if present
-        col_name = col.strip('"\'')
-        if 'tags' in col_name.lower():
-            tags_col_idx = i
-            print(f"Found tags column at index {tags_col_idx}: '{col_name}'")
-            break
-    
-    if tags_col_idx == -1:
-        print("Warning: No 'tags' column found in CSV. Using default index 1.")
-        tags_col_idx = 1  # Default to second column as fallback
-    
-    # Create a temporary file to write the translated content
-    temp_file = tempfile.mktemp(suffix='.csv')
-    print(f"Writing translated CSV to temporary file: {temp_file}")
-    
-    # Process the file line by line, preserving the original format
-    with open(temp_file, 'w', encoding='utf-8') as f:
-        # Write the header unchanged
-        f.write(lines[0] + '\n')
-        
-        # Process each data line
-        for i in range(1, len(lines)):
-            line = lines[i]
-            if not line.strip():
-                f.write(line + '\n' if i < len(lines) - 1 else line)
-                continue
-            
-            # Parse the line, preserving quotes and delimiters
-            parts = []
-            in_quotes = False
-            current_part = ""
-            for char in line:
-                if char == '"':
-                    in_quotes = not in_quotes
-                    current_part += char
-                elif char == delimiter and not in_quotes:
-                    parts.append(current_part)
-                    current_part = ""
-                else:
-                    current_part += char
-            parts.append(current_part)  # Add the last part
-            
-            # Translate the tags column if it exists
-            if len(parts) > tags_col_idx:
-                tags_part = parts[tags_col_idx]
-                
-                # Check if the tags are quoted
-                if tags_part.startswith('"') and tags_part.endswith('"'):
-                    # Remove the quotes for translation
-                    tags = tags_part[1:-1]
-                    translated_tags = apply_translations(tags, translations)
-                    # Add the quotes back
-                    parts[tags_col_idx] = f'"{translated_tags}"'
-                else:
-                    # No quotes
-                    translated_tags = apply_translations(tags_part, translations)
-                    parts[tags_col_idx] = translated_tags
-                
-                print(f"Row {i}: Translated tags")
-            
-            # Join the parts back together with the original delimiter
-            translated_line = delimiter.join(parts)
-            f.write(translated_line + '\n' if i < len(lines) - 1 else translated_line)
-    
-    # Read the translated file
-    with open(temp_file, 'r', encoding='utf-8') as f:
-        translated_content = f.read()
-    
-    print(f"Translated CSV file size: {len(translated_content)} bytes")
-    
-    # Verify that only the tags column was changed
-    if len(original_content.split('\n')) != len(translated_content.split('\n')):
-        print("Warning: Line count changed during translation")
-    
-    return translated_content
-
-def translate_txt_folder(folder_path: str, translations: Dict[str, str]) -> List[Dict]:
-    """Translate all TXT files in a folder.
-    
-    Args:
-        folder_path: Path to the folder containing TXT files
-        translations: Dictionary mapping original tags to their translations
-        
-    Returns:
-        List of dictionaries with filename and translated content
-    """
-    results = []
-    for filename in os.listdir(folder_path):
-        if filename.endswith('.txt'):
-            file_path = os.path.join(folder_path, filename)
-            translated_content = translate_txt_file(file_path, translations)
-            results.append({
-                'filename': filename,
-                'content': translated_content
-            })
-    return results
-
-def create_translated_txt_files_zip(output_path: str, results: List[Dict]) -> None:
-    """Create a zip file containing translated TXT files.
-    
-    Args:
-        output_path: Path to save the ZIP file
-        results: List of dictionaries with filename and translated content
-    """
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for result in results:
-            file_path = os.path.join(temp_dir, result['filename'])
-            with open(file_path, 'w', encoding='utf-8') as txtfile:
-                txtfile.write(result['content'])
-        
-        with zipfile.ZipFile(output_path, 'w') as zipf:
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    zipf.write(os.path.join(root, file), file)
\ No newline at end of file
+import os
+import csv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PIL import Image
+from io import BytesIO, StringIO
+import zipfile
+import zlib
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from collections import deque
+from typing import List, Dict, Tuple, Optional, Callable, Iterable, Iterator
+
+# Results keep a thumbnail of this size for display, the full image is re-read when a zip needs it
+THUMBNAIL_SIZE = 250
+
+# Downloads above this size are rejected instead of being read into memory
+MAX_DOWNLOAD_BYTES = 50 << 20
+
+# Image file extensions the batch tabs pick up, a tuple so checks are one str.endswith call
+_SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+def get_supported_extensions() -> List[str]:
+    return list(_SUPPORTED_EXTENSIONS)
+
+def make_thumbnail(image: Image.Image, size: int = THUMBNAIL_SIZE) -> Image.Image:
+    """Copy of image that fits in size x size, without touching the original"""
+    # Box-reduce large images out of place instead of copying the full-resolution buffer
+    # just so thumbnail() can shrink it in place (palette/bilevel modes can't be reduced)
+    factor = min(image.width // size, image.height // size)
+    if factor > 1 and image.mode not in ('P', '1', 'I;16'):
+        thumbnail = image.reduce(factor)
+    else:
+        thumbnail = image.copy()
+    thumbnail.thumbnail((size, size))
+    return thumbnail
+
+def file_stem(source: str) -> str:
+    """Name of a file, path or URL without directories and extension, used for zip members"""
+    return os.path.splitext(os.path.basename(source))[0]
+
+def open_result_image(result: Dict) -> Image.Image:
+    """Full-resolution image of a successful result, decoded again from its download or file"""
+    if 'data' in result:
+        return Image.open(BytesIO(result['data']))
+    return Image.open(result['path'])
+
+def is_valid_url(url: str) -> bool:
+    """Basic validation to check if URL has http/https prefix"""
+    return url.startswith(('http://', 'https://'))
+
+def is_valid_path(path: str) -> bool:
+    """Check if a string is a valid file path"""
+    if not path:
+        return False
+
+    # Check if it has a supported extension before touching the filesystem
+    if not path.lower().endswith(_SUPPORTED_EXTENSIONS):
+        return False
+
+    # Check if the file exists
+    return os.path.isfile(path)
+
+def process_urls_or_paths(
+    inputs: List[str],
+    tagger,
+    transform,
+    threshold: float,
+    progress_callback: Optional[Callable[[int, int], bool]] = None
+) -> List[Dict]:
+    """Process images from a list of URLs or file paths and return results"""
+    results_dict = {}
+
+    # Strip once, the stripped strings key results_dict and rebuild the output order
+    inputs = [input_str.strip() for input_str in inputs]
+
+    # Separate URLs and file paths while preserving order
+    urls = []
+    file_paths = []
+
+    seen = set()
+
+    for input_str in inputs:
+        # Repeats are fetched and tagged once, the final loop maps them all to the same result
+        if not input_str or input_str in seen:
+            continue
+        seen.add(input_str)
+
+        if is_valid_url(input_str):
+            urls.append(input_str)
+        elif is_valid_path(input_str):
+            file_paths.append(input_str)
+        else:
+            # Invalid input - add directly to results_dict
+            results_dict[input_str] = {
+                'input': input_str,
+                'error': "Invalid URL or file path"
+            }
+
+    # Calculate total items for progress
+    total_items = len(urls) + len(file_paths)
+    processed_count = 0
+
+    continue_processing = True
+
+    # Download URLs in parallel, tagging finished downloads in batches as they arrive
+    if urls:
+        def url_progress(current: int, total: int) -> bool:
+            nonlocal processed_count, continue_processing
+            processed_count = current
+            if progress_callback:
+                continue_processing = progress_callback(current, total_items)
+            return continue_processing
+
+        for result in tag_urls(urls, tagger, transform, threshold, url_progress):
+            results_dict[result['url']] = result
+
+    # Tag file paths in batches, opening and transforming the next batch while one is on the GPU
+    if file_paths and continue_processing:
+        url_count = processed_count
+
+        def path_progress(current: int, total: int) -> bool:
+            if progress_callback:
+                return progress_callback(url_count + current, total_items)
+            return True
+
+        files = [(os.path.basename(file_path), file_path) for file_path in file_paths]
+        for result in tag_files(files, tagger, transform, threshold, path_progress):
+            results_dict[result['path']] = result
+
+    # Reconstruct results in original order
+    return [results_dict[input_str] for input_str in inputs if input_str in results_dict]
+
+def iter_tag_files(
+    files: List[Tuple[str, str]],
+    tagger,
+    transform,
+    threshold: float,
+    progress_callback: Optional[Callable[[int, int], bool]] = None,
+    batch_size: int = 16
+) -> Iterator[Dict]:
+    """Tag (filename, path) pairs and yield one result per file, in order.
+
+    Results are yielded as each batch finishes, so a consumer can write them out
+    without holding the whole run. If progress_callback returns False, tagging
+    stops after the files up to that point.
+    """
+    # Process files in batches with progress updates. The next batch is opened
+    # and transformed on a loader thread while the current one is on the GPU.
+    total_files = len(files)
+    batches = [files[start:start + batch_size] for start in range(0, total_files, batch_size)]
+
+    def load_batch(entries):
+        batch_results = []
+        batch_images = []
+        for filename, file_path in entries:
+            result = {
+                'filename': filename,
+                'path': file_path
+            }
+            try:
+                batch_images.append((result, Image.open(file_path)))
+            except Exception as e:
+                result['error'] = str(e)
+            # Keep results in input order, successful entries are filled in below
+            batch_results.append(result)
+
+        prepared = None
+        thumbnails = []
+        opened = list(batch_images)
+        try:
+            if batch_images:
+                try:
+                    prepared = tagger.preprocess([image for _, image in batch_images], transform, batch_size)
+                except Exception:
+                    # Image.open is lazy, so a truncated or corrupt file only fails here; decode
+                    # each image on its own so only the broken ones get the error
+                    decoded = []
+                    for result, image in batch_images:
+                        try:
+                            image.load()
+                            decoded.append((result, image))
+                        except Exception as e:
+                            result['error'] = str(e)
+                    batch_images = decoded
+                    if batch_images:
+                        prepared = tagger.preprocess([image for _, image in batch_images], transform, batch_size)
+                # The images are decoded by now, so the thumbnails are built here and
+                # overlap with inference of the previous batch
+                thumbnails = [make_thumbnail(image) for _, image in batch_images]
+        except Exception as e:
+            if isinstance(prepared, tuple):
+                # e.g. a thumbnail failed after preprocess, the batch is never inferred
+                tagger.release(prepared[0])
+            prepared = e
+        finally:
+            # Nothing reads the full images after this, close them now instead of leaving
+            # their files open (multi-frame formats, failed batches) until garbage collection
+            for _, image in opened:
+                image.close()
+        return batch_results, batch_images, prepared, thumbnails
+
+    def release_loaded(loaded):
+        # A prepared batch that never reaches infer still holds one of the tagger's pinned buffers
+        prepared = loaded[2]
+        if isinstance(prepared, tuple):
+            tagger.release(prepared[0])
+
+    with ThreadPoolExecutor(max_workers=1) as loader:
+        pending = loader.submit(load_batch, batches[0]) if batches else None
+        loaded = None
+        try:
+            for index, entries in enumerate(batches):
+                loaded = pending.result()
+                pending = None
+                batch_results, batch_images, prepared, thumbnails = loaded
+
+                # Update progress and check for cancellation
+                processed = len(entries)
+                if progress_callback:
+                    for i in range(len(entries)):
+                        if not progress_callback(index * batch_size + i + 1, total_files):
+                            # Processing was cancelled
+                            processed = i
+                            break
+
+                if processed == len(entries) and index + 1 < len(batches):
+                    pending = loader.submit(load_batch, batches[index + 1])
+
+                # infer hands the batch back itself, even when it raises
+                loaded = None
+                try:
+                    if isinstance(prepared, Exception):
+                        raise prepared
+                    if prepared is not None:
+                        batch_tags = tagger.infer(*prepared, threshold, transform)
+                        for (result, _), thumbnail, (tags, scores) in zip(batch_images, thumbnails, batch_tags):
+                            result['stem'] = file_stem(result['filename'])
+                            result['tags'] = tags
+                            result['scores'] = scores
+                            result['thumbnail'] = thumbnail  # Only a thumbnail is kept for display
+                except Exception as e:
+                    for result, _ in batch_images:
+                        result['error'] = str(e)
+
+                yield from batch_results[:processed]
+
+                if processed < len(entries):
+                    break
+        finally:
+            # The consumer stopped early (break, close()) or a callback raised: drop the batches
+            # that were loaded but not inferred, and don't start one the loader hasn't picked up
+            if loaded is not None:
+                release_loaded(loaded)
+            if pending is not None and not pending.cancel():
+                try:
+                    release_loaded(pending.result())
+                except Exception:
+                    pass
+
+def tag_files(
+    files: List[Tuple[str, str]],
+    tagger,
+    transform,
+    threshold: float,
+    progress_callback: Optional[Callable[[int, int], bool]] = None,
+    batch_size: int = 16
+) -> List[Dict]:
+    """Tag (filename, path) pairs and return one result per file, in order"""
+    return list(iter_tag_files(files, tagger, transform, threshold, progress_callback, batch_size))
+
+def process_folder(
+    folder_path: str,
+    tagger,
+    transform,
+    threshold: float,
+    progress_callback: Optional[Callable[[int, int], bool]] = None
+) -> List[Dict]:
+    """Process all images in a folder and return results"""
+    return list(iter_folder(folder_path, tagger, transform, threshold, progress_callback))
+
+def iter_folder(
+    folder_path: str,
+    tagger,
+    transform,
+    threshold: float,
+    progress_callback: Optional[Callable[[int, int], bool]] = None
+) -> Iterator[Dict]:
+    """Process all images in a folder, yielding results in folder order as each batch finishes"""
+    try:
+        # Get list of files first
+        image_files = []
+        # scandir entries carry the file type, so this needs no stat per file on most filesystems
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(_SUPPORTED_EXTENSIONS) and entry.is_file():
+                    image_files.append((entry.name, entry.path))
+
+        yield from iter_tag_files(image_files, tagger, transform, threshold, progress_callback)
+    except Exception as e:
+        yield {'error': f"Error processing folder: {str(e)}"}
+
+def _new_session() -> requests.Session:
+    """Keep-alive session that retries dropped or refused connections twice with a short backoff"""
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=Retry(total=2, backoff_factor=0.1))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def iter_downloads(
+    urls: List[str],
+    max_workers: int = 4,
+    request_delay: float = 0.5,
+    prefetch: int = 4
+):
+    """Download and decode images from a list of URLs in parallel with rate limiting.
+
+    Yields (index, result) as each download finishes, where result is a
+    {'url', 'stem', 'image', 'data'} dict with the decoded image and the downloaded
+    bytes, or a {'url', 'error'} dict. At most max_workers + prefetch downloads are
+    queued or finished but not yet consumed, so a slow consumer holds back the
+    downloads instead of letting decoded images pile up. Closing the generator
+    cancels the rest.
+    """
+    from concurrent.futures import wait, FIRST_COMPLETED
+    import threading
+    import time
+
+    # Earliest time the next request may start; workers claim their slot under the lock
+    # and sleep outside it, so requests stay request_delay apart without serializing I/O
+    next_request_time = 0.0
+    schedule_lock = threading.Lock()
+    # Set once the generator is closed, so workers that already started skip their request
+    cancelled = threading.Event()
+    # One keep-alive session per worker, so repeated requests to a host skip the TCP/TLS handshake
+    sessions = threading.local()
+
+    def download_single_url(url: str) -> Dict:
+        nonlocal next_request_time
+        with schedule_lock:
+            current_time = time.monotonic()
+            request_time = max(current_time, next_request_time)
+            next_request_time = request_time + request_delay
+
+        # Enforce rate limiting
+        if request_time > current_time:
+            time.sleep(request_time - current_time)
+
+        try:
+            if cancelled.is_set():
+                raise RuntimeError("Download cancelled")
+            if not hasattr(sessions, 'session'):
+                sessions.session = _new_session()
+            # Streamed so error responses are never downloaded and the connection always
+            # goes back to the session; the body is read in one call instead of joined chunks
+            with sessions.session.get(url, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                # Refuse oversized bodies up front when the server announces the size, and stop
+                # reading one byte past the cap when it doesn't
+                if int(response.headers.get('Content-Length') or 0) > MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"Image is larger than {MAX_DOWNLOAD_BYTES >> 20} MB")
+                data = response.raw.read(MAX_DOWNLOAD_BYTES + 1, decode_content=True)
+                if len(data) > MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"Image is larger than {MAX_DOWNLOAD_BYTES >> 20} MB")
+
+            image = Image.open(BytesIO(data))
+            image.load()
+
+            return {
+                'url': url,
+                'stem': file_stem(url),
+                'image': image,
+                'data': data
+            }
+        except Exception as e:
+            return {
+                'url': url,
+                'error': str(e)
+            }
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    next_index = 0
+    try:
+        while pending or next_index < len(urls):
+            # Keep the pool busy, but only a bounded number of results ahead of the consumer
+            while next_index < len(urls) and len(pending) < max_workers + prefetch:
+                pending[executor.submit(download_single_url, urls[next_index])] = next_index
+                next_index += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def download_images(
+    urls: List[str],
+    progress_callback: Optional[Callable[[int, int], bool]] = None,
+    max_workers: int = 4,
+    request_delay: float = 0.5
+) -> List[Dict]:
+    """Download and decode images from a list of URLs in parallel with rate limiting.
+
+    Returns one {'url', 'stem', 'image', 'data'} or {'url', 'error'} dict per finished download, in
+    the order of urls. If progress_callback returns False the remaining downloads are
+    cancelled and only the finished ones are returned.
+    """
+    results = [None] * len(urls)
+    downloads = iter_downloads(urls, max_workers, request_delay)
+    for count, (index, result) in enumerate(downloads, 1):
+        results[index] = result
+        if progress_callback and not progress_callback(count, len(urls)):
+            downloads.close()
+            break
+
+    return [result for result in results if result is not None]
+
+def tag_urls(
+    urls: List[str],
+    tagger,
+    transform,
+    threshold: float,
+    progress_callback: Optional[Callable[[int, int], bool]] = None,
+    max_workers: int = 4,
+    request_delay: float = 0.5,
+    batch_size: int = 16
+) -> List[Dict]:
+    """Download and tag images from a list of URLs, in the order of urls.
+
+    Finished downloads are tagged a batch at a time on the calling thread while the
+    next ones are still downloading. If progress_callback returns False the remaining
+    downloads are cancelled and only the finished ones are returned.
+    """
+    results = [None] * len(urls)
+    batch = []
+
+    def tag_batch():
+        try:
+            batch_tags = tagger.process_images([result['image'] for result in batch], transform, threshold)
+            for result, (tags, scores) in zip(batch, batch_tags):
+                result['tags'] = tags
+                result['scores'] = scores
+                # The downloaded bytes stay for the zip, the decoded image is only needed for display
+                result['thumbnail'] = make_thumbnail(result.pop('image'))
+        except Exception as e:
+            for result in batch:
+                del result['image'], result['data']
+                result['error'] = str(e)
+        batch.clear()
+
+    downloads = iter_downloads(urls, max_workers, request_delay)
+    for count, (index, result) in enumerate(downloads, 1):
+        results[index] = result
+        if 'error' not in result:
+            batch.append(result)
+            if len(batch) == batch_size:
+                tag_batch()
+
+        if progress_callback and not progress_callback(count, len(urls)):
+            downloads.close()
+            break
+
+    if batch:
+        tag_batch()
+
+    return [result for result in results if result is not None]
+
+def process_urls(
+    urls: List[str],
+    tagger,
+    transform,
+    threshold: float,
+    progress_callback: Optional[Callable[[int, int], bool]] = None,
+    max_workers: int = 4,
+    request_delay: float = 0.5
+) -> List[Dict]:
+    """Process images from a list of URLs with rate limiting and parallel processing"""
+    return tag_urls(urls, tagger, transform, threshold, progress_callback, max_workers, request_delay)
+
+_CSV_HEADER = ('image_url', 'tags')
+
+def _csv_writer(file):
+    """Semicolon-delimited writer; fields containing ; " or a line break get quoted"""
+    return csv.writer(file, delimiter=';', lineterminator='\n')
+
+def format_results_as_csv(results: List[Dict]) -> str:
+    """Format the results as a CSV string with semi-colon delimiter"""
+    buffer = StringIO()
+    writer = _csv_writer(buffer)
+    writer.writerow(_CSV_HEADER)
+    writer.writerows(map(_format_csv_row, results))
+    return buffer.getvalue()
+
+def _format_csv_row(result: Dict) -> Tuple[str, str]:
+    if 'error' in result:
+        # Handle error case
+        source = result.get('filename') or result.get('url') or result.get('input', 'unknown')
+        return source, f"ERROR: {result['error']}"
+
+    # Handle success case
+    source = result.get('filename') or result.get('url') or result.get('path', 'unknown')
+    return source, result.get('tags', '')
+
+def write_csv_file(output_path: str, results: Iterable[Dict]) -> None:
+    """Write the results straight to a CSV file, one row at a time.
+
+    Same content as save_csv_to_file(output_path, format_results_as_csv(results))
+    without holding the whole document in memory. results can be a generator such
+    as iter_folder, which is then consumed as rows are written.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # A 1 MiB buffer turns the per-row writes into a handful of write syscalls
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
+        writer = _csv_writer(csvfile)
+        writer.writerow(_CSV_HEADER)
+        writer.writerows(map(_format_csv_row, results))
+
+def save_csv_to_file(output_path: str, csv_content: str) -> None:
+    """Save CSV content to a file"""
+    import os
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Encoded once and written in one call, without a text layer in between
+    with open(output_path, 'wb') as csvfile:
+        csvfile.write(csv_content.encode('utf-8'))
+
+# Image members are already compressed, DEFLATE only pays off on the tag text files
+_STORED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+# With the optional isal package, zipfile's DEFLATE runs on ISA-L, several times faster than zlib.
+# Only levels 1-3 exist in ISA-L, anything else still goes to zlib.
+try:
+    from isal import isal_zlib
+except ImportError:
+    isal_zlib = None
+
+if isal_zlib is not None:
+    class _IsalZlib:
+        """zlib stand-in for zipfile that compresses with ISA-L where it can"""
+
+        def __getattr__(self, name):
+            return getattr(zlib, name)
+
+        @staticmethod
+        def compressobj(level=zlib.Z_DEFAULT_COMPRESSION, *args, **kwargs):
+            if 1 <= level <= isal_zlib.ISAL_BEST_COMPRESSION:
+                return isal_zlib.compressobj(level, *args, **kwargs)
+            return zlib.compressobj(level, *args, **kwargs)
+
+    zipfile.zlib = _IsalZlib()
+
+def zip_compression(name: str) -> Dict:
+    """compress_type/compresslevel arguments for a zip member, chosen by file extension"""
+    if name.lower().endswith(_STORED_EXTENSIONS):
+        return {'compress_type': zipfile.ZIP_STORED}
+    return {'compress_type': zipfile.ZIP_DEFLATED, 'compresslevel': 1}
+
+def create_txt_files_zip(output_path: str, results: List[Dict]) -> None:
+    """Create a zip file containing text files with tags and scores"""
+    create_output_files(results, txt_zip_path=output_path)
+
+def create_txt_and_images_zip(output_path: str, results: List[Dict]) -> None:
+    """Create a zip file containing text files with tags and scores and images"""
+    create_output_files(results, all_zip_path=output_path)
+
+def _open_zip(stack: ExitStack, path: str) -> zipfile.ZipFile:
+    """ZipFile for writing through a 4 MiB file buffer, closed when stack exits"""
+    file = stack.enter_context(open(path, 'wb', buffering=4 << 20))
+    return stack.enter_context(zipfile.ZipFile(file, 'w'))
+
+def _encode_png(result: Dict) -> bytes:
+    with BytesIO() as buffered, open_result_image(result) as image:
+        image.save(buffered, 'PNG')
+        return buffered.getvalue()
+
+def _ordered_map(executor, fn, items, window: int):
+    """Like executor.map, but with at most window calls queued or finished and not yet consumed"""
+    pending = deque()
+    for item in items:
+        if len(pending) == window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+def create_output_files(results: List[Dict], csv_path: Optional[str] = None, txt_zip_path: Optional[str] = None, all_zip_path: Optional[str] = None) -> None:
+    """Write the CSV, the TXT zip and the TXT + images zip for one set of results.
+
+    The CSV is streamed, tag files go straight into both zips from memory and each
+    image is PNG-encoded once, on a thread pool in parallel with the zip writes.
+    Outputs whose path is None are skipped.
+    """
+    # Later results with the same name replace earlier ones, like files in a staging folder would
+    members = {}
+    for result in results:
+        if 'error' not in result:
+            stem = result.get('stem') or file_stem(result.get('filename', result.get('url', 'unknown')))
+            members[stem] = result
+
+    if csv_path is not None:
+        write_csv_file(csv_path, results)
+
+    if txt_zip_path is None and all_zip_path is None:
+        return
+
+    with ExitStack() as stack:
+        txt_zip = _open_zip(stack, txt_zip_path) if txt_zip_path is not None else None
+        all_zip = _open_zip(stack, all_zip_path) if all_zip_path is not None else None
+
+        if all_zip is not None:
+            # PIL releases the GIL while encoding; the zip itself is only written from this thread
+            workers = min(8, os.cpu_count() or 1)
+            encoder = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+            pngs = _ordered_map(encoder, _encode_png, members.values(), 2 * workers)
+
+        for stem, result in members.items():
+            if txt_zip is not None:
+                txt_zip.writestr(stem + '.txt', result['tags'], **zip_compression('.txt'))
+            if all_zip is not None:
+                all_zip.writestr(stem + '.txt', result['tags'], **zip_compression('.txt'))
+                all_zip.writestr(stem + '.png', next(pngs), **zip_compression('.png'))
+
+# Tag Translation Functions
+
+def load_translations_from_csv(file_path: str) -> Dict[str, str]:
+    """Load translations from a CSV file.
+
+    Args:
+        file_path: Path to the CSV file
+
+    Returns:
+        Dictionary mapping original tags to their translations
+    """
+    translations = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if len(row) >= 2 and row[1].strip():  # Only store non-empty translations
+                translations[row[0]] = row[1]
+    return translations
+
+def save_translations_to_csv(file_path: str, translations: Dict[str, str]) -> None:
+    """Save translations to a CSV file.
+
+    Args:
+        file_path: Path to save the CSV file
+        translations: Dictionary mapping original tags to their translations
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["original", "translation"])
+        for original, translation in translations.items():
+            writer.writerow([original, translation])
+
+def apply_translations(text: str, translations: Dict[str, str]) -> str:
+    """Apply translations to a comma-separated string of tags.
+
+    Args:
+        text: Comma-separated string of tags
+        translations: Dictionary mapping original tags to their translations
+
+    Returns:
+        Translated comma-separated string of tags
+    """
+    # Handle empty input
+    if not text.strip():
+        return ""
+
+    # Process each tag according to the translations; no per-tag logging, this runs
+    # for every row of a translated CSV
+    translated_tags = []
+    for tag in text.split(','):
+        tag = tag.strip()
+        if not tag:
+            continue
+        translation = translations.get(tag)
+        if translation is None:
+            # Keep original tag if no translation exists
+            translated_tags.append(tag)
+        elif translation != '.':  # Special character for deletion
+            # Add all translated tags (may be multiple comma-separated tags)
+            translated_tags.extend(part.strip() for part in translation.split(',') if part.strip())
+
+    # Join the translated tags with commas
+    return ', '.join(translated_tags)
+
+def translate_txt_file(input_path: str, translations: Dict[str, str]) -> str:
+    """Translate tags in a TXT file.
+
+    Args:
+        input_path: Path to the TXT file
+        translations: Dictionary mapping original tags to their translations
+
+    Returns:
+        Translated content as a string
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    translated_content = apply_translations(content, translations)
+
+    return translated_content
+
+def translate_csv_file(input_path: str, translations: Dict[str, str]) -> str:
+    """Translate tags in a CSV file (only the 'tags' column).
+
+    Args:
+        input_path: Path to the CSV file
+        translations: Dictionary mapping original tags to their translations
+
+    Returns:
+        Translated content as a string
+    """
+    print(f"Translating CSV file: {input_path}")
+    print(f"Number of translations: {len(translations)}")
+
+    # Read the entire file as text
+    with open(input_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if not content:
+        print("Empty file")
+        return ""
+
+    # First, detect the delimiter from the header line
+    header_line = content.split('\n', 1)[0]
+    delimiter = next((d for d in (',', ';', '\t', '|') if d in header_line), ',')
+    print(f"Using delimiter: '{delimiter}'")
+
+    # The csv module splits quoted fields (delimiters and "" escapes inside quotes) in C
+    rows = csv.reader(StringIO(content), delimiter=delimiter)
+    header = next(rows)
+
+    # Find the tags column
+    tags_col_idx = next((i for i, col in enumerate(header) if 'tags' in col.strip('"\'').lower()), -1)
+    if tags_col_idx == -1:
+        print("Warning: No 'tags' column found in CSV. Using default index 1.")
+        tags_col_idx = 1  # Default to second column as fallback
+    else:
+        print(f"Found tags column at index {tags_col_idx}: '{header[tags_col_idx]}'")
+
+    output = StringIO()
+    writer = csv.writer(output, delimiter=delimiter, lineterminator='\n')
+    writer.writerow(header)
+    for row in rows:
+        # Translate the tags column if it exists, quoting is redone by the writer
+        if len(row) > tags_col_idx:
+            row[tags_col_idx] = apply_translations(row[tags_col_idx], translations)
+        writer.writerow(row)
+
+    translated_content = output.getvalue()
+    # Like the input, end without a newline if it had none
+    if not content.endswith('\n'):
+        translated_content = translated_content[:-1]
+
+    print(f"Translated CSV file size: {len(translated_content)} bytes")
+    return translated_content
+
+def translate_txt_folder(folder_path: str, translations: Dict[str, str]) -> List[Dict]:
+    """Translate all TXT files in a folder.
+
+    Args:
+        folder_path: Path to the folder containing TXT files
+        translations: Dictionary mapping original tags to their translations
+
+    Returns:
+        List of dictionaries with filename and translated content
+    """
+    with os.scandir(folder_path) as entries:
+        txt_files = [(entry.name, entry.path) for entry in entries if entry.name.endswith('.txt') and entry.is_file()]
+
+    # Tag files are small, so opening and reading them is most of the cost; threads overlap
+    # that I/O, while a process pool would pickle the translations for every file
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        contents = executor.map(lambda path: translate_txt_file(path, translations), [path for _, path in txt_files])
+        return [
+            {
+                'filename': filename,
+                'content': translated_content
+            }
+            for (filename, _), translated_content in zip(txt_files, contents)
+        ]
+
+def create_translated_txt_files_zip(output_path: str, results: List[Dict]) -> None:
+    """Create a zip file containing translated TXT files.
+
+    Args:
+        output_path: Path to save the ZIP file
+        results: List of dictionaries with filename and translated content
+    """
+    with zipfile.ZipFile(output_path, 'w') as zipf:
+        for result in results:
+            zipf.writestr(result['filename'], result['content'])
\ No newline at end of file
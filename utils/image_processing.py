@@ -1,104 +1,239 @@
-import torch
-from PIL import Image
-from torchvision.transforms import transforms, InterpolationMode
-import torchvision.transforms.functional as TF
-
-class Fit(torch.nn.Module):
-    def __init__(
-        self,
-        bounds: tuple[int, int] | int,
-        interpolation = InterpolationMode.LANCZOS,
-        grow: bool = True,
-        pad: float | None = None
-    ):
-        super().__init__()
-        
-        self.bounds = (bounds, bounds) if isinstance(bounds, int) else bounds
-        self.interpolation = interpolation
-        self.grow = grow
-        self.pad = pad
-    
-    def forward(self, img: Image) -> Image:
-        wimg, himg = img.size
-        hbound, wbound = self.bounds
-        
-        hscale = hbound / himg
-        wscale = wbound / wimg
-        
-        if not self.grow:
-            hscale = min(hscale, 1.0)
-            wscale = min(wscale, 1.0)
-        
-        scale = min(hscale, wscale)
-        if scale == 1.0:
-            return img
-        
-        hnew = min(round(himg * scale), hbound)
-        wnew = min(round(wimg * scale), wbound)
-        
-        img = TF.resize(img, (hnew, wnew), self.interpolation)
-        
-        if self.pad is None:
-            return img
-        
-        hpad = hbound - hnew
-        wpad = wbound - wnew
-        
-        tpad = hpad // 2
-        bpad = hpad - tpad
-        
-        lpad = wpad // 2
-        rpad = wpad - lpad
-        
-        return TF.pad(img, (lpad, tpad, rpad, bpad), self.pad)
-    
-    def __repr__(self) -> str:
-        return (
-            f"{self.__class__.__name__}(" +
-            f"bounds={self.bounds}, " +
-            f"interpolation={self.interpolation.value}, " +
-            f"grow={self.grow}, " +
-            f"pad={self.pad})"
-        )
-
-class CompositeAlpha(torch.nn.Module):
-    def __init__(
-        self,
-        background: tuple[float, float, float] | float,
-    ):
-        super().__init__()
-        
-        self.background = (background, background, background) if isinstance(background, float) else background
-        self.background = torch.tensor(self.background).unsqueeze(1).unsqueeze(2)
-    
-    def forward(self, img: torch.Tensor) -> torch.Tensor:
-        if img.shape[-3] == 3:
-            return img
-        
-        alpha = img[..., 3, None, :, :]
-        
-        img[..., :3, :, :] *= alpha
-        
-        background = self.background.expand(-1, img.shape[-2], img.shape[-1])
-        if background.ndim == 1:
-            background = background[:, None, None]
-        elif background.ndim == 2:
-            background = background[None, :, :]
-        
-        img[..., :3, :, :] += (1.0 - alpha) * background
-        return img[..., :3, :, :]
-    
-    def __repr__(self) -> str:
-        return (
-            f"{self.__class__.__name__}(" +
-            f"background={self.background})"
-        )
-
-def create_transform():
-    return transforms.Compose([
-        Fit((384, 384)),
-        transforms.ToTensor(),
-        CompositeAlpha(0.5),
-        transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5], inplace=True),
-        transforms.CenterCrop((384, 384)),
-    ])
\ No newline at end of file
+import os
+import torch
+import numpy as np
+from PIL import Image
+from torchvision.transforms import transforms, InterpolationMode
+import torchvision.transforms.functional as TF
+
+class Fit(torch.nn.Module):
+    def __init__(
+        self,
+        bounds: tuple[int, int] | int,
+        interpolation = InterpolationMode.LANCZOS,
+        grow: bool = True,
+        pad: float | None = None,
+        reducing_gap: float | None = None
+    ):
+        super().__init__()
+
+        self.bounds = (bounds, bounds) if isinstance(bounds, int) else bounds
+        self.interpolation = interpolation
+        self.grow = grow
+        self.pad = pad
+        self.reducing_gap = reducing_gap
+
+    def _scale(self, wimg: int, himg: int) -> float:
+        hbound, wbound = self.bounds
+
+        hscale = hbound / himg
+        wscale = wbound / wimg
+
+        if not self.grow:
+            hscale = min(hscale, 1.0)
+            wscale = min(wscale, 1.0)
+
+        return min(hscale, wscale)
+
+    def draft(self, img: Image) -> None:
+        """Let a JPEG that hasn't been decoded yet decode at 1/2, 1/4 or 1/8 scale.
+
+        libjpeg picks the smallest scale that still covers reducing_gap times the
+        target size, which is the part of the resize PIL would otherwise do with a
+        box filter. No-op for other formats and images that are already loaded.
+        """
+        if not isinstance(img, Image.Image):
+            return
+        scale = self._scale(*img.size) * (self.reducing_gap or 1.0)
+        if scale < 0.5:
+            img.draft(None, (round(img.width * scale), round(img.height * scale)))
+
+    def forward(self, img: Image) -> Image:
+        wimg, himg = img.size
+        hbound, wbound = self.bounds
+
+        scale = self._scale(wimg, himg)
+        if scale == 1.0:
+            return img
+
+        hnew = min(round(himg * scale), hbound)
+        wnew = min(round(wimg * scale), wbound)
+
+        if self.reducing_gap is not None and isinstance(img, Image.Image):
+            # PIL first shrinks by an integer factor with a box filter while the image
+            # stays at least reducing_gap times the target, then resamples the rest
+            img = img.resize(
+                (wnew, hnew),
+                TF.pil_modes_mapping[self.interpolation],
+                reducing_gap=self.reducing_gap
+            )
+        else:
+            img = TF.resize(img, (hnew, wnew), self.interpolation)
+
+        if self.pad is None:
+            return img
+
+        hpad = hbound - hnew
+        wpad = wbound - wnew
+
+        tpad = hpad // 2
+        bpad = hpad - tpad
+
+        lpad = wpad // 2
+        rpad = wpad - lpad
+
+        return TF.pad(img, (lpad, tpad, rpad, bpad), self.pad)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(" +
+            f"bounds={self.bounds}, " +
+            f"interpolation={self.interpolation.value}, " +
+            f"grow={self.grow}, " +
+            f"pad={self.pad}, " +
+            f"reducing_gap={self.reducing_gap})"
+        )
+
+class CompositeAlpha(torch.nn.Module):
+    def __init__(
+        self,
+        background: tuple[float, float, float] | float,
+    ):
+        super().__init__()
+
+        background = (background, background, background) if isinstance(background, float) else background
+        # A buffer, so .to(device) on the transform moves it along
+        self.register_buffer('background', torch.tensor(background).view(3, 1, 1), persistent=False)
+
+    def forward(self, img: torch.Tensor) -> torch.Tensor:
+        if img.shape[-3] == 3:
+            return img
+
+        # rgb * alpha + background * (1 - alpha) as one broadcast lerp over CHW or NCHW,
+        # without writing into the caller's tensor
+        background = self.background.to(dtype=img.dtype, device=img.device)
+        return torch.lerp(background, img[..., :3, :, :], img[..., 3:, :, :])
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(" +
+            f"background={self.background})"
+        )
+
+class ToCanvas(torch.nn.Module):
+    """Center an RGB/RGBA image on a transparent uint8 RGBA canvas (HWC).
+
+    The padding stays transparent so compositing turns it into the same
+    background gray CenterCrop's zero padding produces after Normalize.
+    """
+    def __init__(
+        self,
+        size: tuple[int, int] | int,
+    ):
+        super().__init__()
+
+        self.size = (size, size) if isinstance(size, int) else size
+
+    def forward(self, img: Image) -> torch.Tensor:
+        hcanvas, wcanvas = self.size
+        pixels = np.asarray(img)
+        himg, wimg = pixels.shape[:2]
+
+        top = (hcanvas - himg) // 2
+        left = (wcanvas - wimg) // 2
+
+        canvas = np.zeros((hcanvas, wcanvas, 4), dtype=np.uint8)
+        region = canvas[top:top + himg, left:left + wimg]
+        region[..., :pixels.shape[2]] = pixels
+        if pixels.shape[2] == 3:
+            region[..., 3] = 255
+        return torch.from_numpy(canvas)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(" +
+            f"size={self.size})"
+        )
+
+class CompositeCanvas(torch.nn.Module):
+    """Turn a uint8 NHWC batch of RGBA canvases into normalized NCHW floats.
+
+    Does ToTensor, CompositeAlpha and Normalize in one pass, on whatever
+    device the canvases are on.
+    """
+    def __init__(
+        self,
+        background: float = 0.5,
+        mean: float = 0.5,
+        std: float = 0.5
+    ):
+        super().__init__()
+
+        self.background = background
+        self.mean = mean
+        self.std = std
+
+    def forward(self, canvas: torch.Tensor) -> torch.Tensor:
+        img = canvas.permute(0, 3, 1, 2).float().div_(255.0)
+
+        alpha = img[:, 3:, :, :]
+        img = img[:, :3, :, :] * alpha
+        img += (1.0 - alpha) * self.background
+
+        return img.sub_(self.mean).div_(self.std)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(" +
+            f"background={self.background}, " +
+            f"mean={self.mean}, " +
+            f"std={self.std})"
+        )
+
+class DeviceTransform:
+    """Transform split into a host stage (resize onto a uint8 canvas) and a
+    device stage (composite and normalize), so batches cross PCIe as uint8.
+
+    Calling it directly runs both stages and gives the same tensor as create_transform.
+    """
+    def __init__(self, host_transform, device_transform):
+        self.host_transform = host_transform
+        self.device_transform = device_transform
+
+    def __call__(self, img: Image) -> torch.Tensor:
+        return self.device_transform(self.host_transform(img).unsqueeze(0))[0]
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(" +
+            f"host_transform={self.host_transform}, " +
+            f"device_transform={self.device_transform})"
+        )
+
+def resize_interpolation() -> InterpolationMode:
+    """Filter Fit resizes with, LANCZOS unless AUTOTAGGER_RESIZE names another mode (e.g. bilinear)"""
+    name = os.environ.get('AUTOTAGGER_RESIZE')
+    if not name:
+        return InterpolationMode.LANCZOS
+    # Fit resizes PIL images, so only modes PIL has a filter for are accepted
+    modes = {mode.value: mode for mode in TF.pil_modes_mapping}
+    if name.lower() not in modes:
+        raise ValueError(f"AUTOTAGGER_RESIZE={name!r} is not supported, use one of: {', '.join(modes)}")
+    return modes[name.lower()]
+
+def create_transform():
+    return transforms.Compose([
+        Fit((384, 384), resize_interpolation(), reducing_gap=3.0),
+        transforms.ToTensor(),
+        CompositeAlpha(0.5),
+        transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5], inplace=True),
+        transforms.CenterCrop((384, 384)),
+    ])
+
+def create_gpu_transform():
+    return DeviceTransform(
+        transforms.Compose([
+            Fit((384, 384), resize_interpolation(), reducing_gap=3.0),
+            ToCanvas((384, 384)),
+        ]),
+        CompositeCanvas(0.5, mean=0.5, std=0.5),
+    )
\ No newline at end of file